@@ -0,0 +1,141 @@
+"""
+Answer Key Module
+
+Compiled, in-memory answer keys used to grade quiz submissions without
+reading quiz_question on every submit.
+
+A key stores a quiz's question ids, correct options and points as compact
+parallel arrays (points in hundredths, so sums stay exact) plus an index
+from question id to array position. Keys are rebuilt on demand after the
+quiz CRUD functions invalidate them. Before a cached key is used its
+version is compared with quiz.key_version (one primary-key lookup), which
+the CRUD functions bump with every question edit, so edits made by other
+API processes are never graded with an old key. Keys also expire after
+ANSWER_KEY_TTL_SECONDS to pick up writes made outside the API.
+"""
+
+import os
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.shuffling import option_mask
+
+ANSWER_KEY_TTL_SECONDS = int(os.getenv("ANSWER_KEY_TTL_SECONDS", "600"))
+
+
+class GradedAnswer(NamedTuple):
+    question_id: int
+    chosen_option: str
+    is_correct: bool
+
+
+class Grade(NamedTuple):
+    answers: List[GradedAnswer]
+    correct_answers: int
+    score_cents: int
+
+
+class AnswerKey:
+    """Parallel arrays of one quiz's questions, ordered by question id."""
+
+    __slots__ = (
+        "quiz_id", "shuffle", "question_ids", "correct_options", "points_cents", "option_masks",
+        "index", "max_score_cents", "version", "loaded_at"
+    )
+
+    def __init__(self, quiz_id: int, rows: Iterable[Tuple], shuffle: bool = False, version: int = 0):
+        """`rows` are (question_id, correct_option, points, option_a, ..., option_d) tuples."""
+        self.quiz_id = quiz_id
+        self.shuffle = shuffle
+        self.version = version
+        self.question_ids = array("i")
+        self.correct_options = bytearray()
+        self.points_cents = array("i")
+        self.option_masks = bytearray()
+        for question_id, correct_option, points, *options in sorted(rows, key=lambda row: row[0]):
+            self.question_ids.append(question_id)
+            self.correct_options += (correct_option or "?")[:1].upper().encode("ascii", "replace")
+            # Questions without points are worth 1
+            self.points_cents.append(round(float(points) * 100) if points else 100)
+            self.option_masks.append(option_mask(options))
+        self.index: Dict[int, int] = {question_id: i for i, question_id in enumerate(self.question_ids)}
+        self.max_score_cents = sum(self.points_cents)
+        self.loaded_at = time.monotonic()
+
+    @property
+    def question_count(self) -> int:
+        return len(self.question_ids)
+
+    def grade(self, answers: Iterable[Tuple[int, str]]) -> Grade:
+        """Grade (question_id, chosen_option) pairs; unknown questions are ignored, the last answer to a question wins."""
+        chosen: Dict[int, str] = {}
+        for question_id, chosen_option in answers:
+            if question_id in self.index:
+                chosen[question_id] = chosen_option
+
+        graded: List[GradedAnswer] = []
+        correct_answers = 0
+        score_cents = 0
+        for question_id, chosen_option in chosen.items():
+            position = self.index[question_id]
+            is_correct = (chosen_option or "").upper() == chr(self.correct_options[position])
+            if is_correct:
+                correct_answers += 1
+                score_cents += self.points_cents[position]
+            graded.append(GradedAnswer(question_id, chosen_option, is_correct))
+        return Grade(graded, correct_answers, score_cents)
+
+
+class AnswerKeyCache:
+    """Per-process cache of compiled answer keys, keyed by quiz id."""
+
+    def __init__(self, ttl_seconds: float = ANSWER_KEY_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._keys: Dict[int, AnswerKey] = {}
+        self._lock = threading.Lock()
+        # Bumped by invalidate so a load that raced an edit is not cached
+        self._generation = 0
+
+    def get(self, db: Session, quiz_id: int) -> AnswerKey:
+        with self._lock:
+            key = self._keys.get(quiz_id)
+            generation = self._generation
+        if key is not None and time.monotonic() - key.loaded_at <= self.ttl_seconds:
+            version = db.query(models.Quiz.key_version).filter(models.Quiz.quiz_id == quiz_id).scalar()
+            if version == key.version:
+                return key
+
+        question = models.QuizQuestion
+        rows = db.query(
+            question.question_id,
+            question.correct_option,
+            question.points,
+            question.option_a,
+            question.option_b,
+            question.option_c,
+            question.option_d
+        ).filter(question.quiz_id == quiz_id).all()
+        quiz = db.query(models.Quiz.shuffle, models.Quiz.key_version).filter(models.Quiz.quiz_id == quiz_id).first()
+        key = AnswerKey(quiz_id, rows, bool(quiz and quiz.shuffle), quiz.key_version if quiz else 0)
+        with self._lock:
+            if generation == self._generation:
+                self._keys[quiz_id] = key
+        return key
+
+    def invalidate(self, quiz_id: Optional[int] = None) -> None:
+        """Drop one quiz's key, or every key when quiz_id is None."""
+        with self._lock:
+            self._generation += 1
+            if quiz_id is None:
+                self._keys.clear()
+            else:
+                self._keys.pop(quiz_id, None)
+
+
+# Singleton cache shared by all requests in this process
+answer_keys = AnswerKeyCache()
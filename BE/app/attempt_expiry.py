@@ -0,0 +1,147 @@
+"""
+Attempt Expiry Module
+
+Server-side enforcement of quiz time limits. An attempt's deadline is its
+start time plus the quiz duration, capped at the quiz end time; after a
+grace period an unsubmitted attempt is finalised with the answers saved so
+far.
+
+Deadlines live in a min-heap served by one daemon thread that sleeps until
+the earliest one is due and then hands a batch of attempt ids to the
+finalise callback. The heap is filled on startup by one indexed sweep over
+in-progress attempts and afterwards whenever an attempt is started or
+resumed, so requests never scan for stale attempts.
+"""
+
+import heapq
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+GRACE_SECONDS = int(os.getenv("ATTEMPT_EXPIRY_GRACE_SECONDS", "30"))
+SWEEP_INTERVAL_SECONDS = int(os.getenv("ATTEMPT_EXPIRY_SWEEP_SECONDS", "300"))
+BATCH_SIZE = int(os.getenv("ATTEMPT_EXPIRY_BATCH_SIZE", "500"))
+RETRY_SECONDS = 30
+
+
+def attempt_deadline(started_at: datetime, duration_minutes: Optional[int], end_time: Optional[datetime]) -> datetime:
+    """
+    When an attempt has to be submitted (quizzes without a duration get 30
+    minutes). All times are naive UTC, as quiz times are stored.
+    """
+    deadline = started_at + timedelta(minutes=duration_minutes or 30)
+    return min(deadline, end_time) if end_time else deadline
+
+
+class ExpiryQueue:
+    """Min-heap of (deadline, attempt_id); superseded heap entries are skipped lazily."""
+
+    def __init__(self, grace_seconds: float = GRACE_SECONDS, batch_size: int = BATCH_SIZE):
+        self.grace = timedelta(seconds=grace_seconds)
+        self.batch_size = batch_size
+        self._heap: List[Tuple[datetime, int]] = []
+        self._deadlines: Dict[int, datetime] = {}
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._finalise: Optional[Callable[[Session, List[int]], int]] = None
+
+    def schedule(self, attempt_id: int, deadline: datetime) -> None:
+        with self._condition:
+            if self._deadlines.get(attempt_id) == deadline:
+                return
+            self._deadlines[attempt_id] = deadline
+            heapq.heappush(self._heap, (deadline, attempt_id))
+            if self._heap[0][1] == attempt_id:
+                self._condition.notify()
+
+    def cancel(self, attempt_id: int) -> None:
+        """Forget an attempt, e.g. once it was submitted."""
+        with self._condition:
+            self._deadlines.pop(attempt_id, None)
+
+    def is_expired(self, attempt_id: int) -> bool:
+        """Whether a scheduled attempt is past its deadline and grace period (O(1))."""
+        with self._condition:
+            deadline = self._deadlines.get(attempt_id)
+        return deadline is not None and datetime.utcnow() > deadline + self.grace
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._deadlines)
+
+    def start(self, finalise: Callable[[Session, List[int]], int]) -> None:
+        """Run `finalise(db, attempt_ids)` on a daemon thread as deadlines pass."""
+        self._finalise = finalise
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="lms-attempt-expiry", daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _pop_due(self) -> List[int]:
+        """Wait for the earliest deadline, then pop up to a batch of due attempts."""
+        with self._condition:
+            while not self._stopped.is_set():
+                # Drop entries superseded by a reschedule or cancel
+                while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                wait = (self._heap[0][0] + self.grace - datetime.utcnow()).total_seconds()
+                if wait > 0:
+                    self._condition.wait(wait)
+                    continue
+
+                due = []
+                now = datetime.utcnow()
+                while self._heap and len(due) < self.batch_size and self._heap[0][0] + self.grace <= now:
+                    deadline, attempt_id = heapq.heappop(self._heap)
+                    if self._deadlines.get(attempt_id) == deadline:
+                        due.append(attempt_id)
+                return due
+            return []
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            due = self._pop_due()
+            if not due:
+                continue
+            db = SessionLocal()
+            try:
+                self._finalise(db, due)
+            except Exception:
+                db.rollback()
+                logger.exception(f"Expiring {len(due)} quiz attempts failed; retrying in {RETRY_SECONDS}s")
+                retry_at = datetime.utcnow() + timedelta(seconds=RETRY_SECONDS) - self.grace
+                with self._condition:
+                    for attempt_id in due:
+                        if attempt_id in self._deadlines:
+                            self._deadlines[attempt_id] = retry_at
+                            heapq.heappush(self._heap, (retry_at, attempt_id))
+                continue
+            finally:
+                db.close()
+            with self._condition:
+                for attempt_id in due:
+                    self._deadlines.pop(attempt_id, None)
+
+
+# Singleton queue shared by all requests in this process
+attempt_expiry = ExpiryQueue()
@@ -0,0 +1,150 @@
+import os
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import column, table, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app import models
+
+# Materialised views defined in DB/LMS.sql, refreshed by the background scheduler
+ANALYTICS_VIEWS = (
+    "mv_course_enrollment",
+    "mv_course_attendance",
+    "mv_course_quiz_avg",
+    "mv_course_assignment_avg",
+)
+
+REFRESH_INTERVAL_SECONDS = int(os.getenv("ANALYTICS_REFRESH_SECONDS", "600"))
+# "start-end" hours (server time, end exclusive) when requests never trigger a refresh
+PEAK_HOURS = os.getenv("ANALYTICS_PEAK_HOURS", "7-19")
+
+mv_course_enrollment = table(
+    "mv_course_enrollment",
+    column("course_id"),
+    column("enrolled_count"),
+    column("active_count"),
+    column("average_grade"),
+)
+mv_course_attendance = table(
+    "mv_course_attendance",
+    column("course_id"),
+    column("total_records"),
+    column("present_count"),
+)
+mv_course_quiz_avg = table(
+    "mv_course_quiz_avg",
+    column("course_id"),
+    column("attempt_count"),
+    column("avg_quiz_score"),
+)
+mv_course_assignment_avg = table(
+    "mv_course_assignment_avg",
+    column("course_id"),
+    column("graded_count"),
+    column("avg_assignment_score"),
+)
+
+
+def is_peak_hours(now: Optional[datetime] = None) -> bool:
+    """Whether `now` falls inside the configured peak window"""
+    try:
+        start, end = (int(part) for part in PEAK_HOURS.split("-"))
+    except ValueError:
+        return False
+    hour = (now or datetime.now()).hour
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+def refresh_views(db: Session, concurrently: bool = True) -> datetime:
+    """Refresh every analytics view and record when it happened"""
+    keyword = "CONCURRENTLY " if concurrently else ""
+    refreshed_at = datetime.utcnow()
+    for view_name in ANALYTICS_VIEWS:
+        db.execute(text(f"REFRESH MATERIALIZED VIEW {keyword}{view_name}"))
+        refreshed_at = datetime.utcnow()
+        stmt = pg_insert(models.AnalyticsRefresh).values(view_name=view_name, refreshed_at=refreshed_at)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["view_name"],
+            set_={"refreshed_at": refreshed_at}
+        )
+        db.execute(stmt)
+        db.commit()
+    return refreshed_at
+
+
+def get_refreshed_at(db: Session) -> Optional[datetime]:
+    """Time of the oldest view refresh, or None if any view was never refreshed"""
+    rows = db.query(models.AnalyticsRefresh).filter(
+        models.AnalyticsRefresh.view_name.in_(ANALYTICS_VIEWS)
+    ).all()
+    if len(rows) < len(ANALYTICS_VIEWS):
+        return None
+    return min(row.refreshed_at for row in rows)
+
+
+def ensure_fresh(db: Session, max_staleness_seconds: Optional[int] = None) -> Optional[datetime]:
+    """
+    Return the views' refresh time, refreshing them first when they are older
+    than `max_staleness_seconds` and it is outside peak hours. During peak
+    hours stale data is served as-is so requests never scan the base tables.
+    """
+    refreshed_at = get_refreshed_at(db)
+    if max_staleness_seconds is None:
+        return refreshed_at
+
+    stale = (
+        refreshed_at is None
+        or (datetime.utcnow() - refreshed_at).total_seconds() > max_staleness_seconds
+    )
+    if stale and not is_peak_hours():
+        refreshed_at = refresh_views(db)
+    return refreshed_at
+
+
+def get_course_analytics(
+    db: Session,
+    course_ids: Optional[Iterable[int]] = None,
+    max_staleness_seconds: Optional[int] = None
+) -> Tuple[Dict[int, object], Optional[datetime]]:
+    """
+    Read per-course enrollment, attendance, quiz and assignment aggregates
+    from the materialised views.
+
+    Returns a mapping of course_id -> row and the views' refresh time.
+    Courses created after the last refresh are absent from the mapping.
+    """
+    refreshed_at = ensure_fresh(db, max_staleness_seconds)
+
+    enrollment = mv_course_enrollment.c
+    attendance = mv_course_attendance.c
+    quiz_avg = mv_course_quiz_avg.c
+    assignment_avg = mv_course_assignment_avg.c
+
+    query = db.query(
+        enrollment.course_id,
+        enrollment.enrolled_count,
+        enrollment.active_count,
+        enrollment.average_grade,
+        attendance.total_records,
+        attendance.present_count,
+        quiz_avg.avg_quiz_score,
+        assignment_avg.avg_assignment_score
+    ).select_from(mv_course_enrollment).outerjoin(
+        mv_course_attendance, attendance.course_id == enrollment.course_id
+    ).outerjoin(
+        mv_course_quiz_avg, quiz_avg.course_id == enrollment.course_id
+    ).outerjoin(
+        mv_course_assignment_avg, assignment_avg.course_id == enrollment.course_id
+    )
+
+    if course_ids is not None:
+        course_ids = list(course_ids)
+        if not course_ids:
+            return {}, refreshed_at
+        query = query.filter(enrollment.course_id.in_(course_ids))
+
+    return {row.course_id: row for row in query.all()}, refreshed_at
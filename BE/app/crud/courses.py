@@ -22,61 +22,74 @@ def _student_full_name(student: models.Student) -> str:
     return " ".join(filter(None, [student.fname, student.lname, student.mname]))
 
 
-def list_courses(db: Session) -> List[schemas.CourseSummary]:
-    """Get all courses"""
-    courses = db.query(models.Course).order_by(models.Course.course_name.asc()).all()
-    result = []
+def list_course_summaries(
+    db: Session,
+    student_user_id: Optional[int] = None,
+    lecturer_id: Optional[int] = None,
+    course_id: Optional[int] = None
+) -> List[schemas.CourseSummary]:
+    """
+    Course summaries with lecturer name and enrolled count from one
+    statement: courses joined to their lecturer and to a grouped enrollment
+    count. Shared by the student, lecturer and manager course lists.
+    """
+    scope = []
+    if student_user_id is not None:
+        scope.append(models.Course.course_id.in_(
+            db.query(models.Enroll.course_id).filter(models.Enroll.student_id == student_user_id)
+        ))
+    if lecturer_id is not None:
+        scope.append(models.Course.lecturer_id == lecturer_id)
+    if course_id is not None:
+        scope.append(models.Course.course_id == course_id)
+    
+    enrolled = db.query(
+        models.Enroll.course_id,
+        func.count(models.Enroll.enroll_id).label("enrolled_count")
+    )
+    if scope:
+        # Only count enrollments of the courses being listed
+        enrolled = enrolled.filter(models.Enroll.course_id.in_(
+            db.query(models.Course.course_id).filter(*scope)
+        ))
+    enrolled = enrolled.group_by(models.Enroll.course_id).subquery()
+    
+    rows = db.query(
+        models.Course,
+        models.Lecturer,
+        func.coalesce(enrolled.c.enrolled_count, 0)
+    ).outerjoin(
+        models.Lecturer, models.Lecturer.user_id == models.Course.lecturer_id
+    ).outerjoin(
+        enrolled, enrolled.c.course_id == models.Course.course_id
+    ).filter(*scope).order_by(models.Course.course_name.asc(), models.Course.course_id).all()
     
-    for course in courses:
-        lecturer_name = None
-        if course.lecturer:
-            lecturer_name = _lecturer_full_name(course.lecturer)
-        
-        enrolled_count = db.query(models.Enroll).filter(
-            models.Enroll.course_id == course.course_id
-        ).count()
-        
-        result.append(schemas.CourseSummary(
+    return [
+        schemas.CourseSummary(
             id=course.course_id,
             code=course.course_code,
             name=course.course_name,
             credits=course.credits,
             semester=course.semester,
             capacity=course.capacity,
-            lecturer_name=lecturer_name,
+            lecturer_name=_lecturer_full_name(lecturer) if lecturer else None,
             enrolled_count=enrolled_count,
             description=course.description,
-            image_url=getattr(course, "image_url", None)
-        ))
-    
-    return result
+            image_url=course.image_url
+        )
+        for course, lecturer, enrolled_count in rows
+    ]
+
+
+def list_courses(db: Session) -> List[schemas.CourseSummary]:
+    """Get all courses"""
+    return list_course_summaries(db)
 
 
 def get_course(db: Session, course_id: int) -> Optional[schemas.CourseSummary]:
     """Get a single course by ID"""
-    course = db.query(models.Course).filter(models.Course.course_id == course_id).first()
-    if not course:
-        return None
-    
-    lecturer_name = None
-    if course.lecturer:
-        lecturer_name = _lecturer_full_name(course.lecturer)
-    
-    enrolled_count = db.query(models.Enroll).filter(
-        models.Enroll.course_id == course.course_id
-    ).count()
-    
-    return schemas.CourseSummary(
-        id=course.course_id,
-        code=course.course_code,
-        name=course.course_name,
-        credits=course.credits,
-        semester=course.semester,
-        capacity=course.capacity,
-        lecturer_name=lecturer_name,
-        enrolled_count=enrolled_count,
-        description=course.description
-    )
+    courses = list_course_summaries(db, course_id=course_id)
+    return courses[0] if courses else None
 
 
 def create_course(db: Session, payload: schemas.CourseCreate) -> schemas.CourseSummary:
@@ -172,9 +185,6 @@ def get_course_detail(db: Session, course_id: int) -> Optional[schemas.CourseDet
     # Get quizzes
     quizzes = []
     for quiz in course.quizzes:
-        question_count = db.query(models.QuizQuestion).filter(
-            models.QuizQuestion.quiz_id == quiz.quiz_id
-        ).count()
         quizzes.append(schemas.QuizSummary(
             id=quiz.quiz_id,
             course_id=quiz.course_id,
@@ -184,7 +194,8 @@ def get_course_detail(db: Session, course_id: int) -> Optional[schemas.CourseDet
             max_attempts=quiz.max_attempts or 1,
             start_time=quiz.start_time,
             end_time=quiz.end_time,
-            question_count=question_count
+            question_count=quiz.question_count or 0,
+            max_score=float(quiz.max_score or 0)
         ))
     
     # Get feedback
@@ -5,6 +5,8 @@ from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app import models, schemas
+from app.crud import analytics as analytics_crud
+from app.crud import courses as course_crud
 
 
 def _full_name(lecturer: models.Lecturer) -> str:
@@ -107,31 +109,7 @@ def get_dashboard_stats(db: Session, user_id: int) -> Optional[schemas.LecturerD
 
 def get_lecturer_courses(db: Session, user_id: int) -> List[schemas.CourseSummary]:
     """Get all courses taught by a lecturer"""
-    courses = db.query(models.Course).filter(
-        models.Course.lecturer_id == user_id
-    ).all()
-    
-    result = []
-    for course in courses:
-        enrolled_count = db.query(models.Enroll).filter(
-            models.Enroll.course_id == course.course_id
-        ).count()
-        
-        result.append(schemas.CourseSummary(
-            id=course.course_id,
-            code=course.course_code,
-            name=course.course_name,
-            credits=course.credits,
-            semester=course.semester,
-            capacity=course.capacity,
-            lecturer_name=_full_name(db.query(models.Lecturer).filter(
-                models.Lecturer.user_id == user_id
-            ).first()),
-            enrolled_count=enrolled_count,
-            description=course.description
-        ))
-    
-    return result
+    return course_crud.list_course_summaries(db, lecturer_id=user_id)
 
 
 def get_course_students(db: Session, course_id: int) -> List[schemas.StudentListItem]:
@@ -426,99 +404,74 @@ def get_at_risk_students(db: Session, user_id: int) -> List[schemas.AtRiskStuden
     return result
 
 
-def get_course_attendance_stats(db: Session, user_id: int) -> List[schemas.CourseAttendanceStat]:
+def get_course_attendance_stats(
+    db: Session,
+    user_id: int,
+    max_staleness_seconds: Optional[int] = None
+) -> List[schemas.CourseAttendanceStat]:
     """Get attendance statistics for each course taught by a lecturer"""
     courses = db.query(models.Course).filter(
         models.Course.lecturer_id == user_id
     ).all()
     
+    analytics, refreshed_at = analytics_crud.get_course_analytics(
+        db, [c.course_id for c in courses], max_staleness_seconds
+    )
+    
     result = []
     for course in courses:
-        # Count total attendance records
-        total_records = db.query(models.AttendanceRecord).filter(
-            models.AttendanceRecord.course_id == course.course_id
-        ).count()
+        row = analytics.get(course.course_id)
         
-        if total_records == 0:
-            attendance_rate = 0
-        else:
-            # Count total possible attendances (records * enrolled students)
-            enrolled_count = db.query(models.Enroll).filter(
-                models.Enroll.course_id == course.course_id
-            ).count()
-            
-            total_possible = total_records * enrolled_count
-            
-            # Count actual attendances
-            present_count = db.query(models.AttendanceDetail).join(models.AttendanceRecord).filter(
-                models.AttendanceRecord.course_id == course.course_id,
-                models.AttendanceDetail.status == 'present'
-            ).count()
-            
-            attendance_rate = (present_count / total_possible * 100) if total_possible > 0 else 0
+        attendance_rate = 0
+        if row and row.total_records:
+            # Total possible attendances = records * enrolled students
+            total_possible = row.total_records * row.enrolled_count
+            attendance_rate = (row.present_count / total_possible * 100) if total_possible > 0 else 0
         
         result.append(schemas.CourseAttendanceStat(
             course_id=course.course_id,
             course_code=course.course_code,
             course_name=course.course_name,
-            attendance_rate=round(attendance_rate, 1)
+            attendance_rate=round(attendance_rate, 1),
+            refreshed_at=refreshed_at
         ))
     
     return result
 
 
-def get_course_score_stats(db: Session, user_id: int) -> List[schemas.CourseScoreStat]:
+def get_course_score_stats(
+    db: Session,
+    user_id: int,
+    max_staleness_seconds: Optional[int] = None
+) -> List[schemas.CourseScoreStat]:
     """Get average quiz and assignment scores for each course taught by a lecturer"""
     courses = db.query(models.Course).filter(
         models.Course.lecturer_id == user_id
     ).all()
     
+    analytics, refreshed_at = analytics_crud.get_course_analytics(
+        db, [c.course_id for c in courses], max_staleness_seconds
+    )
+    
     result = []
     for course in courses:
-        # Calculate average quiz score
-        quiz_attempts = db.query(models.QuizAttempt).join(models.Quiz).filter(
-            models.Quiz.course_id == course.course_id,
-            models.QuizAttempt.status == 'completed'
-        ).all()
+        row = analytics.get(course.course_id)
         
         avg_quiz_score = 0
-        if quiz_attempts:
-            total_pct = 0
-            count = 0
-            for attempt in quiz_attempts:
-                if attempt.total_score is not None and attempt.quiz:
-                    max_score = sum(float(q.points or 1) for q in attempt.quiz.questions)
-                    if max_score > 0:
-                        pct = (float(attempt.total_score) / max_score) * 100
-                        total_pct += pct
-                        count += 1
-            if count > 0:
-                avg_quiz_score = total_pct / count
-        
-        # Calculate average assignment score
-        submissions = db.query(models.Submission).join(models.Assignment).filter(
-            models.Assignment.course_id == course.course_id,
-            models.Submission.score != None
-        ).all()
-        
         avg_assignment_score = 0
-        if submissions:
-            total_pct = 0
-            count = 0
-            for sub in submissions:
-                if sub.score is not None and sub.assignment.max_score:
-                    pct = (float(sub.score) / float(sub.assignment.max_score)) * 100
-                    total_pct += pct
-                    count += 1
-            if count > 0:
-                avg_assignment_score = total_pct / count
+        if row:
+            if row.avg_quiz_score is not None:
+                avg_quiz_score = float(row.avg_quiz_score)
+            if row.avg_assignment_score is not None:
+                avg_assignment_score = float(row.avg_assignment_score)
         
         result.append(schemas.CourseScoreStat(
             course_id=course.course_id,
             course_code=course.course_code,
             course_name=course.course_name,
             avg_quiz_score=round(avg_quiz_score, 1),
-            avg_assignment_score=round(avg_assignment_score, 1)
+            avg_assignment_score=round(avg_assignment_score, 1),
+            refreshed_at=refreshed_at
         ))
     
     return result
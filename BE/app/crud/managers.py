@@ -4,7 +4,9 @@ from typing import List, Optional
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from app import models, schemas
+from app import dashboard_snapshot, models, schemas
+from app.crud import analytics as analytics_crud
+from app.crud import courses as course_crud
 
 
 def get_manager_profile(db: Session, user_id: int) -> Optional[schemas.ManagerProfile]:
@@ -24,24 +26,27 @@ def get_manager_profile(db: Session, user_id: int) -> Optional[schemas.ManagerPr
 
 
 def get_dashboard_stats(db: Session) -> schemas.ManagerDashboardStats:
-    """Get dashboard statistics for manager"""
-    total_students = db.query(models.Student).count()
-    total_lecturers = db.query(models.Lecturer).count()
-    total_courses = db.query(models.Course).count()
-    active_enrollments = db.query(models.Enroll).filter(
-        models.Enroll.status == "active"
-    ).count()
+    """Get dashboard statistics for manager from the maintained snapshot"""
+    snapshot = dashboard_snapshot.get_snapshot(db)
+    
+    average_gpa = None
+    # Same as AVG(current_gpa): students without a GPA are not counted
+    if snapshot.gpa_count:
+        average_gpa = round(float(snapshot.gpa_sum) / snapshot.gpa_count, 2)
     
-    # Calculate average GPA
-    avg_gpa = db.query(func.avg(models.Student.current_gpa)).scalar()
-    average_gpa = round(float(avg_gpa), 2) if avg_gpa else None
+    staleness_seconds = None
+    if snapshot.reconciled_at:
+        staleness_seconds = round((datetime.utcnow() - snapshot.reconciled_at).total_seconds(), 1)
     
     return schemas.ManagerDashboardStats(
-        total_students=total_students,
-        total_lecturers=total_lecturers,
-        total_courses=total_courses,
-        active_enrollments=active_enrollments,
-        average_gpa=average_gpa
+        total_students=snapshot.total_students,
+        total_lecturers=snapshot.total_lecturers,
+        total_courses=snapshot.total_courses,
+        active_enrollments=snapshot.active_enrollments,
+        average_gpa=average_gpa,
+        updated_at=snapshot.updated_at,
+        reconciled_at=snapshot.reconciled_at,
+        staleness_seconds=staleness_seconds
     )
 
 
@@ -105,65 +110,16 @@ def get_all_lecturers(db: Session) -> List[schemas.LecturerListItem]:
 
 def get_all_courses(db: Session) -> List[schemas.CourseSummary]:
     """Get all courses with details including average grade"""
-    courses = db.query(models.Course).order_by(models.Course.course_name.asc()).all()
-    result = []
+    courses = course_crud.list_course_summaries(db)
+    analytics, _ = analytics_crud.get_course_analytics(db)
     
     for course in courses:
-        lecturer_name = None
-        if course.lecturer:
-            lecturer_name = " ".join(filter(None, [
-                course.lecturer.title,
-                course.lecturer.fname,
-                course.lecturer.lname,
-                course.lecturer.mname
-            ]))
-        
-        enrolled_count = db.query(models.Enroll).filter(
-            models.Enroll.course_id == course.course_id
-        ).count()
-        
-        # Calculate average grade from Grade table for students enrolled in this course
-        # Get all students enrolled in this course
-        enrolled_students = db.query(models.Enroll.student_id).filter(
-            models.Enroll.course_id == course.course_id
-        ).all()
-        student_ids = [s.student_id for s in enrolled_students]
-        
-        if student_ids:
-            # Get grades for these students in this course
-            grades = db.query(models.Grade).filter(
-                models.Grade.student_id.in_(student_ids),
-                models.Grade.course_id == course.course_id,
-                models.Grade.score.isnot(None),
-                models.Grade.max_score.isnot(None)
-            ).all()
-            
-            total_percentage = 0.0
-            grade_count = 0
-            for grade_obj in grades:
-                # Convert to percentage
-                percentage = (float(grade_obj.score) / float(grade_obj.max_score)) * 100
-                total_percentage += percentage
-                grade_count += 1
-            
-            average_grade = round(total_percentage / grade_count, 2) if grade_count > 0 else None
-        else:
-            average_grade = None
-        
-        result.append(schemas.CourseSummary(
-            id=course.course_id,
-            code=course.course_code,
-            name=course.course_name,
-            credits=course.credits,
-            semester=course.semester,
-            capacity=course.capacity,
-            lecturer_name=lecturer_name,
-            enrolled_count=enrolled_count,
-            description=course.description,
-            average_grade=average_grade
-        ))
+        # Average grade (percentage) of enrolled students, from the analytics view
+        row = analytics.get(course.id)
+        if row and row.average_grade is not None:
+            course.average_grade = round(float(row.average_grade), 2)
     
-    return result
+    return courses
 
 
 def create_course(db: Session, payload: schemas.CourseCreate) -> schemas.CourseSummary:
@@ -334,42 +290,49 @@ def get_all_feedback(db: Session) -> List[schemas.Feedback]:
     return result
 
 
-def get_course_statistics(db: Session) -> dict:
-    """Get course statistics for manager dashboard"""
-    # Courses by semester
-    semester_stats = db.query(
-        models.Course.semester,
-        func.count(models.Course.course_id)
-    ).group_by(models.Course.semester).all()
+def get_course_statistics(
+    db: Session,
+    low_enrollment_threshold: int = 10,
+    semester: Optional[str] = None,
+    max_staleness_seconds: Optional[int] = None
+) -> dict:
+    """Get course statistics for manager dashboard from a single aggregate query"""
+    # Enrollment count per course, read from the materialised view
+    refreshed_at = analytics_crud.ensure_fresh(db, max_staleness_seconds)
+    enrollment_counts = analytics_crud.mv_course_enrollment
     
-    # Average enrollment per course
-    avg_enrollment = db.query(
-        func.avg(
-            db.query(func.count(models.Enroll.enroll_id))
-            .filter(models.Enroll.course_id == models.Course.course_id)
-            .correlate(models.Course)
-            .scalar_subquery()
-        )
-    ).scalar()
+    query = db.query(
+        models.Course.course_id,
+        models.Course.course_name,
+        models.Course.semester,
+        func.coalesce(enrollment_counts.c.enrolled_count, 0).label("enrollment_count")
+    ).outerjoin(
+        enrollment_counts,
+        enrollment_counts.c.course_id == models.Course.course_id
+    )
+    if semester:
+        query = query.filter(models.Course.semester == semester)
     
-    # Courses with low enrollment (< 10 students)
+    semester_stats = {}
+    total_enrollment = 0
+    course_count = 0
     low_enrollment_courses = []
-    courses = db.query(models.Course).all()
-    for course in courses:
-        enrollment_count = db.query(models.Enroll).filter(
-            models.Enroll.course_id == course.course_id
-        ).count()
-        if enrollment_count < 10:
+    for row in query.order_by(models.Course.course_id).all():
+        semester_stats[row.semester] = semester_stats.get(row.semester, 0) + 1
+        total_enrollment += row.enrollment_count
+        course_count += 1
+        if row.enrollment_count < low_enrollment_threshold:
             low_enrollment_courses.append({
-                "course_id": course.course_id,
-                "course_name": course.course_name,
-                "enrollment_count": enrollment_count
+                "course_id": row.course_id,
+                "course_name": row.course_name,
+                "enrollment_count": row.enrollment_count
             })
     
     return {
-        "courses_by_semester": dict(semester_stats),
-        "average_enrollment": float(avg_enrollment) if avg_enrollment else 0,
-        "low_enrollment_courses": low_enrollment_courses
+        "courses_by_semester": semester_stats,
+        "average_enrollment": total_enrollment / course_count if course_count else 0,
+        "low_enrollment_courses": low_enrollment_courses,
+        "refreshed_at": refreshed_at
     }
 
 
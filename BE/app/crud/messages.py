@@ -1,10 +1,22 @@
-from datetime import datetime
-from typing import List, Optional
+import base64
+import binascii
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional, Set, Tuple
 
-from sqlalchemy import or_, and_, func
+from sqlalchemy import or_, and_, case, cast, func, select, text, tuple_, union, union_all
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION, insert as pg_insert
 from sqlalchemy.orm import Session
 
 from app import models, schemas
+from app.realtime import hub
+from app.user_directory import directory
+
+UNREAD_RECONCILE_INTERVAL_SECONDS = int(os.getenv("MESSAGE_UNREAD_RECONCILE_SECONDS", "3600"))
+# Read messages older than this move to message_archive
+HOT_DAYS = int(os.getenv("MESSAGE_HOT_DAYS", "180"))
+ARCHIVE_INTERVAL_SECONDS = int(os.getenv("MESSAGE_ARCHIVE_INTERVAL_SECONDS", "86400"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("MESSAGE_ARCHIVE_BATCH_SIZE", "5000"))
 
 
 def _get_user_full_name(db: Session, user_id: int) -> str:
@@ -29,39 +41,343 @@ def _get_user_full_name(db: Session, user_id: int) -> str:
     return user.username or user.email
 
 
-def get_messages(db: Session, user_id: int, other_user_id: Optional[int] = None) -> List[schemas.Message]:
-    """Get messages for a user, optionally filtered by conversation partner"""
-    query = db.query(models.Message).filter(
-        or_(
-            models.Message.sender_id == user_id,
-            models.Message.receiver_id == user_id
-        )
+def _user_names_subquery(name: str):
+    """Subquery mapping user_id to display name, mirroring _get_user_full_name in SQL"""
+    def _join_names(*parts):
+        return func.concat_ws(" ", *[func.nullif(part, "") for part in parts])
+
+    full_name = case(
+        (
+            and_(models.User.role == "student", models.Student.user_id.isnot(None)),
+            _join_names(models.Student.fname, models.Student.lname, models.Student.mname),
+        ),
+        (
+            and_(models.User.role == "lecturer", models.Lecturer.user_id.isnot(None)),
+            _join_names(models.Lecturer.title, models.Lecturer.fname, models.Lecturer.lname, models.Lecturer.mname),
+        ),
+        (
+            and_(models.User.role == "manager", models.Manager.user_id.isnot(None)),
+            models.Manager.name,
+        ),
+        else_=func.coalesce(func.nullif(models.User.username, ""), models.User.email),
     )
-    
+    return (
+        select(models.User.user_id, full_name.label("full_name"))
+        .outerjoin(models.Student, models.Student.user_id == models.User.user_id)
+        .outerjoin(models.Lecturer, models.Lecturer.user_id == models.User.user_id)
+        .outerjoin(models.Manager, models.Manager.user_id == models.User.user_id)
+        .subquery(name)
+    )
+
+
+def _adjust_unread(db: Session, user_id: int, partner_id: int, delta: int) -> None:
+    """Move the user's per-partner and total unread counters by `delta` (not committed)"""
+    counters = [
+        (models.MessageUnreadCounter, {"user_id": user_id, "partner_id": partner_id}),
+        (models.MessageUnreadTotal, {"user_id": user_id}),
+    ]
+    for model, keys in counters:
+        stmt = pg_insert(model).values(**keys, unread_count=max(delta, 0))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={"unread_count": func.greatest(model.unread_count + delta, 0)}
+        )
+        db.execute(stmt)
+
+
+def reconcile_unread_counters(db: Session) -> None:
+    """Recompute every unread counter from the message table"""
+    db.execute(text("""
+        INSERT INTO message_unread_counter (user_id, partner_id, unread_count)
+        SELECT receiver_id, sender_id, COUNT(*)
+        FROM message
+        WHERE is_read = FALSE
+        GROUP BY receiver_id, sender_id
+        ON CONFLICT (user_id, partner_id) DO UPDATE SET unread_count = EXCLUDED.unread_count
+    """))
+    db.execute(text("""
+        UPDATE message_unread_counter c SET unread_count = 0
+        WHERE c.unread_count <> 0 AND NOT EXISTS (
+            SELECT 1 FROM message m
+            WHERE m.receiver_id = c.user_id AND m.sender_id = c.partner_id AND m.is_read = FALSE
+        )
+    """))
+    db.execute(text("""
+        INSERT INTO message_unread_total (user_id, unread_count)
+        SELECT user_id, SUM(unread_count)
+        FROM message_unread_counter
+        GROUP BY user_id
+        ON CONFLICT (user_id) DO UPDATE SET unread_count = EXCLUDED.unread_count
+    """))
+    db.execute(text("""
+        UPDATE message_unread_total t SET unread_count = 0
+        WHERE t.unread_count <> 0 AND NOT EXISTS (
+            SELECT 1 FROM message_unread_counter c WHERE c.user_id = t.user_id
+        )
+    """))
+    db.commit()
+
+
+def _encode_cursor(created_at: datetime, message_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{message_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a message cursor; raises ValueError when it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, message_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), int(message_id)
+    except (UnicodeError, binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _conversation_branches(user_id: int, other_user_id: Optional[int] = None, table=models.Message) -> list:
+    """
+    Disjoint filters whose union is the user's messages in `table` (message
+    or message_archive). Each branch can be served in (created_at,
+    message_id) order by one of the table's indexes.
+    """
+    if other_user_id and other_user_id != user_id:
+        return [
+            and_(table.sender_id == user_id, table.receiver_id == other_user_id),
+            and_(table.sender_id == other_user_id, table.receiver_id == user_id),
+        ]
     if other_user_id:
-        query = query.filter(
-            or_(
-                and_(models.Message.sender_id == user_id, models.Message.receiver_id == other_user_id),
-                and_(models.Message.sender_id == other_user_id, models.Message.receiver_id == user_id)
-            )
+        return [and_(table.sender_id == user_id, table.receiver_id == user_id)]
+    return [
+        table.sender_id == user_id,
+        and_(table.receiver_id == user_id, table.sender_id != user_id),
+    ]
+
+
+def _select_with_names(window):
+    """Select every column of a message subquery plus sender and receiver names"""
+    sender_names = _user_names_subquery("sender_names")
+    receiver_names = _user_names_subquery("receiver_names")
+    return (
+        select(
+            window,
+            func.coalesce(sender_names.c.full_name, "Unknown User").label("sender_name"),
+            func.coalesce(receiver_names.c.full_name, "Unknown User").label("receiver_name"),
         )
+        .outerjoin(sender_names, sender_names.c.user_id == window.c.sender_id)
+        .outerjoin(receiver_names, receiver_names.c.user_id == window.c.receiver_id)
+    )
+
+
+def _message_from_row(row) -> schemas.Message:
+    return schemas.Message(
+        id=row.message_id,
+        sender_id=row.sender_id,
+        sender_name=row.sender_name,
+        receiver_id=row.receiver_id,
+        receiver_name=row.receiver_name,
+        content=row.content,
+        is_read=row.is_read or False,
+        created_at=row.created_at or datetime.utcnow()
+    )
+
+
+def _fetch_from_table(
+    db: Session,
+    table,
+    user_id: int,
+    other_user_id: Optional[int] = None,
+    before: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None
+) -> List[schemas.Message]:
+    """Load messages from one table newest first with sender/receiver names joined in one statement"""
+    message = table
+    branches = []
+    for condition in _conversation_branches(user_id, other_user_id, table):
+        branch = select(
+            message.message_id,
+            message.sender_id,
+            message.receiver_id,
+            message.content,
+            message.is_read,
+            message.created_at
+        ).where(condition)
+        if before:
+            branch = branch.where(tuple_(message.created_at, message.message_id) < tuple_(*before))
+        if limit is not None:
+            # Each branch stops after `limit` rows of its index scan
+            branch = branch.order_by(message.created_at.desc(), message.message_id.desc()).limit(limit)
+        branches.append(select(branch.subquery()))
+    window = union_all(*branches).subquery("window") if len(branches) > 1 else branches[0].subquery("window")
+
+    stmt = _select_with_names(window).order_by(window.c.created_at.desc(), window.c.message_id.desc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
+    return [_message_from_row(row) for row in db.execute(stmt)]
+
+
+def _archive_watermark(db: Session) -> Optional[datetime]:
+    """Newest created_at in message_archive; nothing newer has been archived"""
+    return db.query(func.max(models.MessageArchive.created_at)).scalar()
+
+
+def _fetch_messages(
+    db: Session,
+    user_id: int,
+    other_user_id: Optional[int] = None,
+    before: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None
+) -> List[schemas.Message]:
+    """
+    Load messages newest first from the hot table, reaching into the archive
+    only when the requested window extends past the archive watermark.
+    """
+    messages = _fetch_from_table(db, models.Message, user_id, other_user_id, before, limit)
+    if limit is not None and len(messages) >= limit:
+        watermark = _archive_watermark(db)
+        if watermark is None or messages[-1].created_at > watermark:
+            return messages
+
+    archived = _fetch_from_table(db, models.MessageArchive, user_id, other_user_id, before, limit)
+    if not archived:
+        return messages
+    merged = sorted(messages + archived, key=lambda m: (m.created_at, m.id), reverse=True)
+    return merged[:limit] if limit is not None else merged
+
+
+def get_messages(db: Session, user_id: int, other_user_id: Optional[int] = None) -> List[schemas.Message]:
+    """Get messages for a user, optionally filtered by conversation partner"""
+    return _fetch_messages(db, user_id, other_user_id)
+
+
+def list_messages(
+    db: Session,
+    user_id: int,
+    other_user_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50
+) -> schemas.MessagePage:
+    """Get one page of messages, newest first, continuing from an opaque cursor"""
+    before = _decode_cursor(cursor) if cursor else None
+    messages = _fetch_messages(db, user_id, other_user_id, before, limit + 1)
     
-    messages = query.order_by(models.Message.created_at.desc()).all()
-    
-    result = []
-    for msg in messages:
-        result.append(schemas.Message(
-            id=msg.message_id,
-            sender_id=msg.sender_id,
-            sender_name=_get_user_full_name(db, msg.sender_id),
-            receiver_id=msg.receiver_id,
-            receiver_name=_get_user_full_name(db, msg.receiver_id),
-            content=msg.content,
-            is_read=msg.is_read or False,
-            created_at=msg.created_at or datetime.utcnow()
-        ))
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        last = messages[-1]
+        next_cursor = _encode_cursor(last.created_at, last.id)
     
-    return result
+    return schemas.MessagePage(items=messages, next_cursor=next_cursor)
+
+
+def _encode_search_cursor(rank: float, message_id: int) -> str:
+    raw = f"{rank!r}|{message_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_search_cursor(cursor: str) -> Tuple[float, int]:
+    """Decode a search cursor; raises ValueError when it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        rank, message_id = raw.split("|", 1)
+        return float(rank), int(message_id)
+    except (UnicodeError, binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def search_messages(
+    db: Session,
+    user_id: int,
+    query: str,
+    other_user_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = 20
+) -> schemas.MessageSearchPage:
+    """
+    Full-text search over the user's messages, best matches first.
+
+    `query` uses web search syntax ("quoted phrases", or, -excluded) and is
+    matched against content_tsv through the GIN indexes of message and
+    message_archive. Pages are keyed on (rank, message_id) so deeper pages
+    cost the same as the first.
+    """
+    ts_query = func.websearch_to_tsquery("simple", query)
+    after = _decode_search_cursor(cursor) if cursor else None
+
+    branches = []
+    for message in (models.Message, models.MessageArchive):
+        # ts_rank_cd is float4; as float8 the cursor's Python float round-trips exactly
+        rank = cast(func.ts_rank_cd(message.content_tsv, ts_query), DOUBLE_PRECISION)
+        branch = select(
+            message.message_id,
+            message.sender_id,
+            message.receiver_id,
+            message.content,
+            message.is_read,
+            message.created_at,
+            rank.label("rank")
+        ).where(
+            message.content_tsv.op("@@")(ts_query),
+            or_(*_conversation_branches(user_id, other_user_id, message))
+        )
+        if after:
+            branch = branch.where(
+                tuple_(rank, message.message_id) < tuple_(cast(after[0], DOUBLE_PRECISION), after[1])
+            )
+        branch = branch.order_by(rank.desc(), message.message_id.desc()).limit(limit + 1)
+        branches.append(select(branch.subquery()))
+    matches = union_all(*branches).subquery("matches")
+
+    stmt = _select_with_names(matches).order_by(matches.c.rank.desc(), matches.c.message_id.desc())
+    items = [
+        schemas.MessageSearchResult(**_message_from_row(row).model_dump(), rank=row.rank)
+        for row in db.execute(stmt)
+    ]
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = _encode_search_cursor(last.rank, last.id)
+
+    return schemas.MessageSearchPage(items=items, next_cursor=next_cursor)
+
+
+def archive_messages(db: Session, hot_days: int = HOT_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Move read messages older than `hot_days` into message_archive, in
+    batches of `batch_size` committed one at a time. The newest message of
+    each conversation stays hot so get_conversations never needs the archive,
+    and unread messages stay hot so the unread counters are unaffected.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=hot_days)
+    total = 0
+    while True:
+        moved = db.execute(text("""
+            WITH moved AS (
+                DELETE FROM message
+                WHERE message_id IN (
+                    SELECT m.message_id
+                    FROM message m
+                    WHERE m.is_read = TRUE
+                      AND m.created_at < :cutoff
+                      AND EXISTS (
+                          SELECT 1 FROM message n
+                          WHERE ((n.sender_id = m.sender_id AND n.receiver_id = m.receiver_id)
+                              OR (n.sender_id = m.receiver_id AND n.receiver_id = m.sender_id))
+                            AND (n.created_at, n.message_id) > (m.created_at, m.message_id)
+                      )
+                    ORDER BY m.message_id
+                    LIMIT :batch_size
+                )
+                RETURNING message_id, sender_id, receiver_id, content, is_read, created_at
+            )
+            INSERT INTO message_archive (message_id, sender_id, receiver_id, content, is_read, created_at)
+            SELECT message_id, sender_id, receiver_id, content, is_read, created_at FROM moved
+        """), {"cutoff": cutoff, "batch_size": batch_size}).rowcount
+        db.commit()
+        total += moved
+        if moved < batch_size:
+            return total
 
 
 def send_message(db: Session, sender_id: int, payload: schemas.MessageCreate) -> schemas.Message:
@@ -74,10 +390,12 @@ def send_message(db: Session, sender_id: int, payload: schemas.MessageCreate) ->
         created_at=datetime.utcnow()
     )
     db.add(message)
+    db.flush()
+    _adjust_unread(db, message.receiver_id, message.sender_id, 1)
     db.commit()
     db.refresh(message)
     
-    return schemas.Message(
+    result = schemas.Message(
         id=message.message_id,
         sender_id=message.sender_id,
         sender_name=_get_user_full_name(db, message.sender_id),
@@ -87,6 +405,15 @@ def send_message(db: Session, sender_id: int, payload: schemas.MessageCreate) ->
         is_read=message.is_read or False,
         created_at=message.created_at or datetime.utcnow()
     )
+    
+    # Push to the receiver and to the sender's other open sessions
+    event = {"type": "message", "message": result.model_dump(mode="json")}
+    if hub.is_connected(result.receiver_id):
+        hub.publish(result.receiver_id, {**event, "unread_count": get_unread_count(db, result.receiver_id)})
+    if result.sender_id != result.receiver_id:
+        hub.publish(result.sender_id, event)
+    
+    return result
 
 
 def mark_messages_read(db: Session, user_id: int, sender_id: int) -> int:
@@ -97,85 +424,152 @@ def mark_messages_read(db: Session, user_id: int, sender_id: int) -> int:
         models.Message.is_read == False
     ).update({models.Message.is_read: True})
     
+    if updated:
+        _adjust_unread(db, user_id, sender_id, -updated)
     db.commit()
+    
+    if updated:
+        if hub.is_connected(user_id):
+            hub.publish(user_id, {
+                "type": "read",
+                "partner_id": sender_id,
+                "messages_marked_read": updated,
+                "unread_count": get_unread_count(db, user_id)
+            })
+        # Read receipt for the original sender
+        if sender_id != user_id:
+            hub.publish(sender_id, {"type": "read_receipt", "reader_id": user_id})
+    
     return updated
 
 
 def get_conversations(db: Session, user_id: int) -> List[schemas.Conversation]:
-    """Get list of conversations (unique users the current user has messaged with)"""
-    # Get all unique users the current user has communicated with
-    sent_to = db.query(models.Message.receiver_id).filter(
-        models.Message.sender_id == user_id
-    ).distinct()
-    
-    received_from = db.query(models.Message.sender_id).filter(
-        models.Message.receiver_id == user_id
-    ).distinct()
-    
-    # Combine both sets
-    all_users = set()
-    for (uid,) in sent_to.all():
-        all_users.add(uid)
-    for (uid,) in received_from.all():
-        all_users.add(uid)
-    
-    conversations = []
-    for other_user_id in all_users:
-        # Get the last message in the conversation
-        last_message = db.query(models.Message).filter(
-            or_(
-                and_(models.Message.sender_id == user_id, models.Message.receiver_id == other_user_id),
-                and_(models.Message.sender_id == other_user_id, models.Message.receiver_id == user_id)
-            )
-        ).order_by(models.Message.created_at.desc()).first()
-        
-        if not last_message:
-            continue
-        
-        # Count unread messages
-        unread_count = db.query(models.Message).filter(
-            models.Message.sender_id == other_user_id,
-            models.Message.receiver_id == user_id,
-            models.Message.is_read == False
-        ).count()
-        
-        conversations.append(schemas.Conversation(
-            user_id=other_user_id,
-            user_name=_get_user_full_name(db, other_user_id),
-            last_message=last_message.content,
-            last_message_time=last_message.created_at or datetime.utcnow(),
-            unread_count=unread_count
-        ))
-    
-    # Sort by last message time
-    conversations.sort(key=lambda c: c.last_message_time, reverse=True)
-    
-    return conversations
+    """Get list of conversations (unique users the current user has messaged with) in one query"""
+    message = models.Message
+    # Conversation key: the other participant, seen from the current user's side
+    partner_id = case(
+        (message.sender_id == user_id, message.receiver_id),
+        else_=message.sender_id
+    )
+    
+    ranked = select(
+        partner_id.label("partner_id"),
+        message.content,
+        message.created_at,
+        func.row_number().over(
+            partition_by=partner_id,
+            order_by=(message.created_at.desc(), message.message_id.desc())
+        ).label("position")
+    ).where(
+        or_(message.sender_id == user_id, message.receiver_id == user_id)
+    ).subquery("ranked")
+    
+    partner_names = _user_names_subquery("partner_names")
+    counter = models.MessageUnreadCounter
+    stmt = select(
+        ranked.c.partner_id,
+        ranked.c.content,
+        ranked.c.created_at,
+        func.coalesce(counter.unread_count, 0).label("unread_count"),
+        func.coalesce(partner_names.c.full_name, "Unknown User").label("user_name")
+    ).outerjoin(
+        partner_names, partner_names.c.user_id == ranked.c.partner_id
+    ).outerjoin(
+        counter, and_(counter.user_id == user_id, counter.partner_id == ranked.c.partner_id)
+    ).where(
+        ranked.c.position == 1
+    ).order_by(ranked.c.created_at.desc().nullslast())
+    
+    return [
+        schemas.Conversation(
+            user_id=row.partner_id,
+            user_name=row.user_name,
+            last_message=row.content,
+            last_message_time=row.created_at or datetime.utcnow(),
+            unread_count=row.unread_count
+        )
+        for row in db.execute(stmt)
+    ]
 
 
 def get_unread_count(db: Session, user_id: int) -> int:
     """Get total count of unread messages for a user"""
-    return db.query(models.Message).filter(
-        models.Message.receiver_id == user_id,
-        models.Message.is_read == False
-    ).count()
+    total = db.get(models.MessageUnreadTotal, user_id)
+    return total.unread_count if total else 0
+
+
+def _user_list_query(name: str = "names"):
+    names = _user_names_subquery(name)
+    return select(
+        models.User.user_id,
+        models.User.username,
+        models.User.email,
+        models.User.role,
+        func.coalesce(names.c.full_name, models.User.email).label("full_name")
+    ).join(names, names.c.user_id == models.User.user_id)
 
 
-def get_available_users(db: Session, current_user_id: int) -> List[schemas.UserListItem]:
-    """Get list of users available to message"""
-    users = db.query(models.User).filter(
+def get_available_users(
+    db: Session,
+    current_user_id: int,
+    skip: int = 0,
+    limit: Optional[int] = None
+) -> List[schemas.UserListItem]:
+    """Get list of users available to message, ordered by name"""
+    stmt = _user_list_query().where(
         models.User.user_id != current_user_id
-    ).all()
-    
-    result = []
-    for user in users:
-        full_name = _get_user_full_name(db, user.user_id)
-        result.append(schemas.UserListItem(
-            user_id=user.user_id,
-            username=user.username,
-            email=user.email,
-            role=user.role,
-            full_name=full_name
-        ))
+    ).order_by(text("full_name"), models.User.user_id).offset(skip).limit(limit)
     
-    return result
+    return [
+        schemas.UserListItem(
+            user_id=row.user_id,
+            username=row.username,
+            email=row.email,
+            role=row.role,
+            full_name=row.full_name
+        )
+        for row in db.execute(stmt)
+    ]
+
+
+def _course_member_ids(db: Session, course_id: int) -> Set[int]:
+    """Students enrolled in a course plus its lecturer"""
+    students = select(models.Enroll.student_id).where(models.Enroll.course_id == course_id)
+    lecturer = select(models.Course.lecturer_id).where(
+        models.Course.course_id == course_id,
+        models.Course.lecturer_id.isnot(None)
+    )
+    return set(db.execute(union(students, lecturer)).scalars())
+
+
+def search_recipients(
+    db: Session,
+    current_user_id: int,
+    query: Optional[str] = None,
+    role: Optional[str] = None,
+    course_id: Optional[int] = None,
+    limit: int = 10
+) -> List[schemas.UserListItem]:
+    """Typeahead over the in-memory user directory: prefix, accent-insensitive name/email match"""
+    if directory.is_stale():
+        directory.load(db.execute(_user_list_query()))
+    
+    members = _course_member_ids(db, course_id) if course_id is not None else None
+    
+    def accept(entry) -> bool:
+        if entry.user_id == current_user_id:
+            return False
+        if role and entry.role != role:
+            return False
+        return members is None or entry.user_id in members
+    
+    return [
+        schemas.UserListItem(
+            user_id=entry.user_id,
+            username=entry.username,
+            email=entry.email,
+            role=entry.role,
+            full_name=entry.full_name
+        )
+        for entry in directory.search(query, limit, accept)
+    ]
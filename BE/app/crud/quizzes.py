@@ -1,10 +1,92 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import case, func, text, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
+from sqlalchemy.orm import Session, joinedload
 
-from app import models, schemas
+from app import item_analysis, models, schemas, shuffling
+from app.answer_keys import AnswerKey, answer_keys
+from app.attempt_expiry import GRACE_SECONDS, attempt_deadline, attempt_expiry
+from app.exam_mode import AttemptOwner, admission, autosave_buffer, quiz_payloads
+
+
+# Whether detail row d answers question qq correctly (same rule as AnswerKey.grade)
+_IS_CORRECT_SQL = "upper(COALESCE(d.chosen_option, '')) = upper(left(qq.correct_option, 1))"
+
+
+def _update_quiz_totals(db: Session, quiz_id: Optional[int] = None) -> None:
+    """Recompute quiz.question_count and quiz.max_score from quiz_question (not committed)"""
+    # Questions without points are worth 1, matching how attempts are graded
+    scope = "WHERE q2.quiz_id = :quiz_id" if quiz_id is not None else ""
+    db.execute(text(f"""
+        UPDATE quiz q
+        SET question_count = t.question_count, max_score = t.max_score
+        FROM (
+            SELECT q2.quiz_id,
+                   COUNT(qq.question_id) AS question_count,
+                   COALESCE(SUM(COALESCE(NULLIF(qq.points, 0), 1)), 0) AS max_score
+            FROM quiz q2
+            LEFT JOIN quiz_question qq ON qq.quiz_id = q2.quiz_id
+            {scope}
+            GROUP BY q2.quiz_id
+        ) t
+        WHERE q.quiz_id = t.quiz_id
+          AND (q.question_count, q.max_score) IS DISTINCT FROM (t.question_count, t.max_score)
+    """), {"quiz_id": quiz_id})
+
+
+def _bump_key_version(db: Session, quiz_id: int) -> None:
+    """Mark the quiz's answer key as changed for every API process (not committed)"""
+    db.execute(
+        update(models.Quiz)
+        .where(models.Quiz.quiz_id == quiz_id)
+        .values(key_version=models.Quiz.key_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def reconcile_quiz_totals(db: Session) -> None:
+    """Recompute every quiz's totals, e.g. after questions were seeded directly"""
+    _update_quiz_totals(db)
+    db.commit()
+    _invalidate_quiz_caches()
+
+
+def _invalidate_quiz_caches(quiz_id: Optional[int] = None) -> None:
+    """Drop cached answer keys and student payloads after questions change (call after commit)"""
+    answer_keys.invalidate(quiz_id)
+    quiz_payloads.invalidate(quiz_id)
+
+
+def _quiz_summary(quiz: models.Quiz) -> schemas.QuizSummary:
+    return schemas.QuizSummary(
+        id=quiz.quiz_id,
+        course_id=quiz.course_id,
+        title=quiz.title,
+        description=quiz.description,
+        duration_minutes=quiz.duration_minutes or 30,
+        max_attempts=quiz.max_attempts or 1,
+        start_time=quiz.start_time,
+        end_time=quiz.end_time,
+        question_count=quiz.question_count or 0,
+        max_score=float(quiz.max_score or 0),
+        shuffle=bool(quiz.shuffle)
+    )
+
+
+def _question_schema(question: models.QuizQuestion, include_answer: bool = True) -> schemas.QuizQuestion:
+    return schemas.QuizQuestion(
+        id=question.question_id,
+        question_text=question.question_text,
+        option_a=question.option_a,
+        option_b=question.option_b,
+        option_c=question.option_c,
+        option_d=question.option_d,
+        points=float(question.points) if question.points else 1.0,
+        correct_option=question.correct_option if include_answer else None
+    )
 
 
 def list_quizzes(db: Session, course_id: Optional[int] = None) -> List[schemas.QuizSummary]:
@@ -15,25 +97,7 @@ def list_quizzes(db: Session, course_id: Optional[int] = None) -> List[schemas.Q
     
     quizzes = query.order_by(models.Quiz.created_at.desc()).all()
     
-    result = []
-    for quiz in quizzes:
-        question_count = db.query(models.QuizQuestion).filter(
-            models.QuizQuestion.quiz_id == quiz.quiz_id
-        ).count()
-        
-        result.append(schemas.QuizSummary(
-            id=quiz.quiz_id,
-            course_id=quiz.course_id,
-            title=quiz.title,
-            description=quiz.description,
-            duration_minutes=quiz.duration_minutes or 30,
-            max_attempts=quiz.max_attempts or 1,
-            start_time=quiz.start_time,
-            end_time=quiz.end_time,
-            question_count=question_count
-        ))
-    
-    return result
+    return [_quiz_summary(quiz) for quiz in quizzes]
 
 
 def get_quiz(db: Session, quiz_id: int) -> Optional[schemas.QuizSummary]:
@@ -42,60 +106,41 @@ def get_quiz(db: Session, quiz_id: int) -> Optional[schemas.QuizSummary]:
     if not quiz:
         return None
     
-    question_count = db.query(models.QuizQuestion).filter(
-        models.QuizQuestion.quiz_id == quiz.quiz_id
-    ).count()
-    
-    return schemas.QuizSummary(
-        id=quiz.quiz_id,
-        course_id=quiz.course_id,
-        title=quiz.title,
-        description=quiz.description,
-        duration_minutes=quiz.duration_minutes or 30,
-        max_attempts=quiz.max_attempts or 1,
-        start_time=quiz.start_time,
-        end_time=quiz.end_time,
-        question_count=question_count
-    )
+    return _quiz_summary(quiz)
 
 
 def get_quiz_detail(db: Session, quiz_id: int, include_answers: bool = False) -> Optional[schemas.QuizDetail]:
-    """Get detailed quiz information including questions"""
+    """Get detailed quiz information including questions; the student view is served from cache"""
+    if not include_answers:
+        return quiz_payloads.get(quiz_id, lambda: _load_quiz_detail(db, quiz_id, False))
+    return _load_quiz_detail(db, quiz_id, True)
+
+
+def _load_quiz_detail(db: Session, quiz_id: int, include_answers: bool) -> Optional[schemas.QuizDetail]:
     quiz = db.query(models.Quiz).filter(models.Quiz.quiz_id == quiz_id).first()
     if not quiz:
         return None
     
+    # Question id order is the canonical order shuffled layouts start from
     questions = db.query(models.QuizQuestion).filter(
         models.QuizQuestion.quiz_id == quiz_id
-    ).all()
-    
-    question_list = []
-    for q in questions:
-        question_list.append(schemas.QuizQuestion(
-            id=q.question_id,
-            question_text=q.question_text,
-            option_a=q.option_a,
-            option_b=q.option_b,
-            option_c=q.option_c,
-            option_d=q.option_d,
-            points=float(q.points) if q.points else 1.0,
-            correct_option=q.correct_option if include_answers else None
-        ))
+    ).order_by(models.QuizQuestion.question_id).all()
+    
+    question_list = [_question_schema(q, include_answers) for q in questions]
     
     return schemas.QuizDetail(
-        id=quiz.quiz_id,
-        course_id=quiz.course_id,
-        title=quiz.title,
-        description=quiz.description,
-        duration_minutes=quiz.duration_minutes or 30,
-        max_attempts=quiz.max_attempts or 1,
-        start_time=quiz.start_time,
-        end_time=quiz.end_time,
-        question_count=len(questions),
+        **_quiz_summary(quiz).model_dump(),
         questions=question_list
     )
 
 
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Quiz times are stored as naive UTC: aware values are converted, naive ones are taken as UTC"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
 def create_quiz(db: Session, payload: schemas.QuizCreate) -> schemas.QuizSummary:
     """Create a new quiz"""
     quiz = models.Quiz(
@@ -104,8 +149,9 @@ def create_quiz(db: Session, payload: schemas.QuizCreate) -> schemas.QuizSummary
         description=payload.description,
         duration_minutes=payload.duration_minutes,
         max_attempts=payload.max_attempts,
-        start_time=payload.start_time,
-        end_time=payload.end_time,
+        start_time=_as_utc(payload.start_time),
+        end_time=_as_utc(payload.end_time),
+        shuffle=payload.shuffle,
         created_at=datetime.utcnow()
     )
     db.add(quiz)
@@ -132,155 +178,369 @@ def add_question_to_quiz(db: Session, quiz_id: int, payload: schemas.QuizQuestio
         points=Decimal(str(payload.points))
     )
     db.add(question)
+    db.flush()
+    _update_quiz_totals(db, quiz_id)
+    _bump_key_version(db, quiz_id)
     db.commit()
+    _invalidate_quiz_caches(quiz_id)
     db.refresh(question)
     
-    return schemas.QuizQuestion(
-        id=question.question_id,
-        question_text=question.question_text,
-        option_a=question.option_a,
-        option_b=question.option_b,
-        option_c=question.option_c,
-        option_d=question.option_d,
-        points=float(question.points) if question.points else 1.0,
-        correct_option=question.correct_option
-    )
+    return _question_schema(question)
+
+
+def update_quiz_question(db: Session, question_id: int, payload: schemas.QuizQuestionUpdate) -> Optional[schemas.QuizQuestion]:
+    """Update a quiz question"""
+    question = db.query(models.QuizQuestion).filter(models.QuizQuestion.question_id == question_id).first()
+    if not question:
+        return None
+    
+    if payload.question_text is not None:
+        question.question_text = payload.question_text
+    if payload.option_a is not None:
+        question.option_a = payload.option_a
+    if payload.option_b is not None:
+        question.option_b = payload.option_b
+    if payload.option_c is not None:
+        question.option_c = payload.option_c
+    if payload.option_d is not None:
+        question.option_d = payload.option_d
+    if payload.correct_option is not None:
+        question.correct_option = payload.correct_option
+    if payload.points is not None:
+        question.points = Decimal(str(payload.points))
+    
+    db.flush()
+    _update_quiz_totals(db, question.quiz_id)
+    _bump_key_version(db, question.quiz_id)
+    db.commit()
+    _invalidate_quiz_caches(question.quiz_id)
+    db.refresh(question)
+    
+    return _question_schema(question)
+
+
+def delete_quiz_question(db: Session, question_id: int) -> bool:
+    """Delete a quiz question"""
+    question = db.query(models.QuizQuestion).filter(models.QuizQuestion.question_id == question_id).first()
+    if not question:
+        return False
+    
+    quiz_id = question.quiz_id
+    # Bulk delete so the database cascades to attempt details
+    db.query(models.QuizQuestion).filter(
+        models.QuizQuestion.question_id == question_id
+    ).delete(synchronize_session=False)
+    _update_quiz_totals(db, quiz_id)
+    _bump_key_version(db, quiz_id)
+    db.commit()
+    _invalidate_quiz_caches(quiz_id)
+    return True
+
+
+def prewarm_quiz(db: Session, quiz_id: int) -> Optional[schemas.QuizSummary]:
+    """Load a quiz's student payload and answer key into memory ahead of an exam"""
+    quiz = get_quiz_detail(db, quiz_id)
+    if not quiz:
+        return None
+    answer_keys.get(db, quiz_id)
+    return schemas.QuizSummary(**quiz.model_dump(exclude={"questions"}))
 
 
 def start_quiz_attempt(db: Session, quiz_id: int, student_id: int) -> Optional[schemas.QuizAttemptResult]:
-    """Start a new quiz attempt or resume an existing in-progress attempt"""
-    quiz = db.query(models.Quiz).filter(models.Quiz.quiz_id == quiz_id).first()
+    """
+    Start a new quiz attempt or resume an existing in-progress attempt.
+
+    Starts for one quiz are admitted a few at a time; raises
+    exam_mode.AdmissionTimeout when the queue does not move in time. The
+    limits and times come from the quiz row rather than the payload cache,
+    which other processes may hold for a while after an edit.
+    """
+    quiz = get_quiz(db, quiz_id)
     if not quiz:
         return None
     
-    # Check for existing in-progress attempt
-    existing_in_progress = db.query(models.QuizAttempt).filter(
-        models.QuizAttempt.quiz_id == quiz_id,
-        models.QuizAttempt.student_id == student_id,
-        models.QuizAttempt.status == "in_progress"
-    ).first()
-    
-    if existing_in_progress:
-        # Resume the existing attempt
-        question_count = db.query(models.QuizQuestion).filter(
-            models.QuizQuestion.quiz_id == quiz_id
-        ).count()
-        max_score_result = db.query(models.QuizQuestion).filter(
-            models.QuizQuestion.quiz_id == quiz_id
+    with admission.admit(quiz_id):
+        # One read covers both the resume check and the attempt limit
+        attempts = db.query(
+            models.QuizAttempt.attempt_id, models.QuizAttempt.status, models.QuizAttempt.started_at
+        ).filter(
+            models.QuizAttempt.quiz_id == quiz_id,
+            models.QuizAttempt.student_id == student_id
         ).all()
-        max_score = sum(float(q.points) if q.points else 1.0 for q in max_score_result)
         
-        return schemas.QuizAttemptResult(
-            attempt_id=existing_in_progress.attempt_id,
-            quiz_id=quiz_id,
-            total_questions=question_count,
-            correct_answers=0,
-            total_score=0.0,
-            max_score=max_score,
-            percentage=0.0,
-            status="in_progress"
-        )
-    
-    # Check if student has remaining attempts (only count completed attempts)
-    completed_attempts = db.query(models.QuizAttempt).filter(
-        models.QuizAttempt.quiz_id == quiz_id,
-        models.QuizAttempt.student_id == student_id,
-        models.QuizAttempt.status == "completed"
-    ).count()
-    
-    if completed_attempts >= (quiz.max_attempts or 1):
-        return None  # No more attempts allowed
-    
-    # Create new attempt
-    attempt = models.QuizAttempt(
-        quiz_id=quiz_id,
-        student_id=student_id,
-        started_at=datetime.utcnow(),
-        status="in_progress"
-    )
-    db.add(attempt)
-    db.commit()
-    db.refresh(attempt)
-    
-    question_count = db.query(models.QuizQuestion).filter(
-        models.QuizQuestion.quiz_id == quiz_id
-    ).count()
-    
-    # Calculate max score
-    max_score_result = db.query(models.QuizQuestion).filter(
-        models.QuizQuestion.quiz_id == quiz_id
-    ).all()
-    max_score = sum(float(q.points) if q.points else 1.0 for q in max_score_result)
+        # Resume an existing in-progress attempt unless its time is up
+        resumable = next((a for a in attempts if a.status == "in_progress"), None)
+        completed_attempts = sum(1 for a in attempts if a.status == "completed")
+        if resumable and _is_past_deadline(resumable.started_at, quiz):
+            expire_attempts(db, [resumable.attempt_id])
+            resumable = None
+            completed_attempts += 1
+        
+        if resumable:
+            attempt_id, started_at = resumable.attempt_id, resumable.started_at
+        else:
+            # Check if student has remaining attempts (only count completed attempts)
+            if completed_attempts >= quiz.max_attempts:
+                return None  # No more attempts allowed
+            if quiz.end_time and datetime.utcnow() >= quiz.end_time:
+                return None  # Quiz has closed
+            
+            attempt = models.QuizAttempt(
+                quiz_id=quiz_id,
+                student_id=student_id,
+                started_at=datetime.utcnow(),
+                status="in_progress"
+            )
+            db.add(attempt)
+            db.flush()
+            attempt_id, started_at = attempt.attempt_id, attempt.started_at
+            db.commit()
+    
+    _track_attempt(attempt_id, student_id, started_at, quiz)
     
     return schemas.QuizAttemptResult(
-        attempt_id=attempt.attempt_id,
+        attempt_id=attempt_id,
         quiz_id=quiz_id,
-        total_questions=question_count,
+        total_questions=quiz.question_count or 0,
         correct_answers=0,
         total_score=0.0,
-        max_score=max_score,
+        max_score=quiz.max_score or 0.0,
         percentage=0.0,
         status="in_progress"
     )
 
 
-def submit_quiz_attempt(db: Session, attempt_id: int, submission: schemas.QuizSubmission) -> Optional[schemas.QuizAttemptResult]:
-    """Submit answers for a quiz attempt"""
-    attempt = db.query(models.QuizAttempt).filter(
+def _is_past_deadline(started_at: Optional[datetime], quiz: schemas.QuizSummary) -> bool:
+    """Whether an attempt started at `started_at` is past its deadline plus the grace period"""
+    if started_at is None:
+        return False
+    deadline = attempt_deadline(started_at, quiz.duration_minutes, quiz.end_time)
+    return datetime.utcnow() > deadline + timedelta(seconds=GRACE_SECONDS)
+
+
+def _track_attempt(attempt_id: int, student_id: int, started_at: Optional[datetime], quiz: schemas.QuizSummary) -> None:
+    """Register an in-progress attempt for autosave and schedule its expiry"""
+    autosave_buffer.register(attempt_id, student_id, quiz.id)
+    if started_at is not None:
+        attempt_expiry.schedule(attempt_id, attempt_deadline(started_at, quiz.duration_minutes, quiz.end_time))
+
+
+def _in_progress_owner(db: Session, attempt_id: int, student_id: int) -> Optional[AttemptOwner]:
+    """The attempt's owner if it is the student's, still in progress and within its time limit"""
+    owner = autosave_buffer.owner(attempt_id)
+    if owner is None:
+        attempt = db.query(models.QuizAttempt).filter(
+            models.QuizAttempt.attempt_id == attempt_id,
+            models.QuizAttempt.status == "in_progress"
+        ).first()
+        if not attempt:
+            return None
+        quiz = get_quiz(db, attempt.quiz_id)
+        if not quiz:
+            return None
+        if _is_past_deadline(attempt.started_at, quiz):
+            expire_attempts(db, [attempt_id])
+            return None
+        _track_attempt(attempt.attempt_id, attempt.student_id, attempt.started_at, quiz)
+        owner = autosave_buffer.owner(attempt_id)
+    elif attempt_expiry.is_expired(attempt_id):
+        return None
+    return owner if owner is not None and owner.student_id == student_id else None
+
+
+def _attempt_layout(key: AnswerKey, attempt_id: int) -> Optional[shuffling.Layout]:
+    """Displayed question/option order of an attempt, or None when the quiz is not shuffled"""
+    if not key.shuffle:
+        return None
+    variant = shuffling.attempt_variant(key.quiz_id, attempt_id)
+    return shuffling.build_layout(key.quiz_id, variant, key.question_ids, key.option_masks)
+
+
+def _shuffled_detail(quiz: schemas.QuizDetail, variant: int) -> schemas.QuizDetail:
+    """A student payload with questions and options in the variant's order"""
+    questions = sorted(quiz.questions, key=lambda q: q.id)
+    options = [(q.option_a, q.option_b, q.option_c, q.option_d) for q in questions]
+    layout = shuffling.build_layout(
+        quiz.id, variant, [q.id for q in questions], [shuffling.option_mask(o) for o in options]
+    )
+    
+    by_id = {q.id: (q, dict(zip(shuffling.OPTION_LETTERS, o))) for q, o in zip(questions, options)}
+    shuffled = []
+    for question_id in layout.order:
+        question, texts = by_id[question_id]
+        a, b, c, d = (texts[letter] for letter in layout.options[question_id])
+        shuffled.append(question.model_copy(update={"option_a": a, "option_b": b, "option_c": c, "option_d": d}))
+    return quiz.model_copy(update={"questions": shuffled})
+
+
+def get_attempt_quiz(db: Session, attempt_id: int, student_id: int) -> Optional[schemas.QuizDetail]:
+    """The quiz as served to one attempt: shuffled per attempt when the quiz has shuffling enabled"""
+    attempt = db.query(models.QuizAttempt.quiz_id, models.QuizAttempt.student_id).filter(
         models.QuizAttempt.attempt_id == attempt_id
     ).first()
-    
-    if not attempt or attempt.status == "completed":
+    if not attempt or attempt.student_id != student_id:
         return None
     
-    # Get quiz questions
-    questions = db.query(models.QuizQuestion).filter(
-        models.QuizQuestion.quiz_id == attempt.quiz_id
-    ).all()
+    quiz = get_quiz_detail(db, attempt.quiz_id)
+    if not quiz or not quiz.shuffle:
+        return quiz
     
-    question_map = {q.question_id: q for q in questions}
+    # Attempts sharing a variant share one cached payload
+    variant = shuffling.attempt_variant(quiz.id, attempt_id)
+    return quiz_payloads.get(quiz.id, lambda: _shuffled_detail(quiz, variant), variant=variant)
+
+
+def save_attempt_answers(
+    db: Session,
+    attempt_id: int,
+    student_id: int,
+    payload: schemas.QuizSubmission
+) -> Optional[schemas.QuizAutosaveResult]:
+    """Buffer in-progress answers in memory; the scheduler writes them out in batches"""
+    owner = _in_progress_owner(db, attempt_id, student_id)
+    if not owner:
+        return None
     
-    total_score = Decimal("0.00")
-    correct_answers = 0
-    max_score = Decimal("0.00")
+    # Only answers the flush can store: a question of this quiz and one option letter (or none)
+    key = answer_keys.get(db, owner.quiz_id)
+    for answer in payload.answers:
+        if answer.question_id not in key.index:
+            raise ValueError(f"Question {answer.question_id} is not part of this quiz")
+        if len(answer.chosen_option) > 1 or answer.chosen_option.upper() not in ("", *shuffling.OPTION_LETTERS):
+            raise ValueError(f"Invalid option {answer.chosen_option!r} for question {answer.question_id}")
+    
+    # Stored answers use canonical option letters
+    layout = _attempt_layout(key, attempt_id)
+    saved = autosave_buffer.save(attempt_id, {
+        answer.question_id: (
+            layout.to_canonical(answer.question_id, answer.chosen_option) if layout else answer.chosen_option
+        ).upper()
+        for answer in payload.answers
+    })
+    return schemas.QuizAutosaveResult(attempt_id=attempt_id, saved_answers=saved)
+
+
+def _saved_answers(db: Session, attempt_id: int, buffered: dict) -> dict:
+    """
+    Answers already written for an attempt, overlaid with the ones still
+    buffered here. The stored rows are always read: another worker or an
+    earlier process may have flushed them.
+    """
+    answers = dict(
+        db.query(models.QuizAttemptDetail.question_id, models.QuizAttemptDetail.chosen_option)
+        .filter(models.QuizAttemptDetail.attempt_id == attempt_id)
+        .all()
+    )
+    answers.update(buffered)
+    return answers
+
+
+def get_attempt_answers(db: Session, attempt_id: int, student_id: int) -> Optional[List[schemas.QuizAnswer]]:
+    """Answers saved so far for an in-progress attempt, e.g. to restore after a reload"""
+    owner = _in_progress_owner(db, attempt_id, student_id)
+    if not owner:
+        return None
     
-    # Process each answer
-    for answer in submission.answers:
-        question = question_map.get(answer.question_id)
-        if not question:
-            continue
-        
-        max_score += question.points if question.points else Decimal("1.00")
-        is_correct = answer.chosen_option.upper() == question.correct_option.upper()
-        
-        if is_correct:
-            correct_answers += 1
-            total_score += question.points if question.points else Decimal("1.00")
-        
-        # Save answer detail
-        detail = models.QuizAttemptDetail(
-            attempt_id=attempt_id,
-            question_id=answer.question_id,
-            chosen_option=answer.chosen_option,
-            is_correct=is_correct
+    answers = _saved_answers(db, attempt_id, autosave_buffer.peek(attempt_id))
+    layout = _attempt_layout(answer_keys.get(db, owner.quiz_id), attempt_id)
+    return [
+        schemas.QuizAnswer(
+            question_id=question_id,
+            chosen_option=layout.to_displayed(question_id, chosen_option) if layout else chosen_option
         )
-        db.add(detail)
+        for question_id, chosen_option in sorted(answers.items())
+        if chosen_option
+    ]
+
+
+def submit_quiz_attempt(
+    db: Session,
+    attempt_id: int,
+    submission: schemas.QuizSubmission,
+    idempotency_key: Optional[str] = None
+) -> Optional[schemas.QuizAttemptResult]:
+    """
+    Submit answers for a quiz attempt.
+
+    The attempt is claimed with a conditional UPDATE, so of several
+    concurrent submits exactly one grades it; the others wait for its row
+    lock. A repeated submit carrying the same idempotency key gets the
+    stored result back, any other submit of a finished attempt gets None.
+    """
+    now = datetime.utcnow()
+    attempt = db.execute(
+        update(models.QuizAttempt)
+        .where(models.QuizAttempt.attempt_id == attempt_id, models.QuizAttempt.status == "in_progress")
+        .values(status="completed", finished_at=now, submission_key=idempotency_key)
+        .returning(models.QuizAttempt.quiz_id, models.QuizAttempt.started_at)
+        .execution_options(synchronize_session=False)
+    ).first()
     
-    # Update attempt
-    attempt.total_score = total_score
-    attempt.finished_at = datetime.utcnow()
-    attempt.status = "completed"
+    if not attempt:
+        db.rollback()
+        if idempotency_key is None:
+            return None
+        stored_key = db.query(models.QuizAttempt.submission_key).filter(
+            models.QuizAttempt.attempt_id == attempt_id
+        ).scalar()
+        return get_quiz_attempt(db, attempt_id) if stored_key == idempotency_key else None
+    
+    key = answer_keys.get(db, attempt.quiz_id)
+    
+    # Past the time limit only the answers saved before it count
+    quiz = get_quiz(db, attempt.quiz_id)
+    submitted = submission.answers
+    if quiz and _is_past_deadline(attempt.started_at, quiz):
+        submitted = []
+    
+    # Autosaved answers count too; the submitted ones take precedence and
+    # are mapped back to canonical letters for shuffled quizzes
+    answers = _saved_answers(db, attempt_id, autosave_buffer.take(attempt_id))
+    layout = _attempt_layout(key, attempt_id)
+    answers.update(
+        (answer.question_id, layout.to_canonical(answer.question_id, answer.chosen_option) if layout else answer.chosen_option)
+        for answer in submitted
+    )
     
+    # Grade in memory against the quiz's cached answer key
+    grade = key.grade(answers.items())
+    
+    # One multi-row upsert for the details (autosaved rows may exist) and one UPDATE for the score,
+    # committed together with the claim
+    if grade.answers:
+        stmt = pg_insert(models.QuizAttemptDetail)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["attempt_id", "question_id"],
+            set_={"chosen_option": stmt.excluded.chosen_option, "is_correct": stmt.excluded.is_correct}
+        )
+        db.execute(stmt, [
+            {
+                "attempt_id": attempt_id,
+                "question_id": answer.question_id,
+                "chosen_option": answer.chosen_option,
+                "is_correct": answer.is_correct
+            }
+            for answer in grade.answers
+        ])
+    
+    total_score = Decimal(grade.score_cents) / 100
+    db.execute(
+        update(models.QuizAttempt)
+        .where(models.QuizAttempt.attempt_id == attempt_id)
+        .values(total_score=total_score)
+        .execution_options(synchronize_session=False)
+    )
     db.commit()
-    db.refresh(attempt)
+    attempt_expiry.cancel(attempt_id)
     
+    max_score = Decimal(key.max_score_cents) / 100
     percentage = float(total_score / max_score * 100) if max_score > 0 else 0.0
     
     return schemas.QuizAttemptResult(
-        attempt_id=attempt.attempt_id,
-        quiz_id=attempt.quiz_id,
-        total_questions=len(questions),
-        correct_answers=correct_answers,
+        attempt_id=attempt_id,
+        quiz_id=key.quiz_id,
+        total_questions=key.question_count,
+        correct_answers=grade.correct_answers,
         total_score=float(total_score),
         max_score=float(max_score),
         percentage=round(percentage, 2),
@@ -288,6 +548,178 @@ def submit_quiz_attempt(db: Session, attempt_id: int, submission: schemas.QuizSu
     )
 
 
+def expire_attempts(db: Session, attempt_ids: List[int]) -> int:
+    """
+    Finalise in-progress attempts that are past their deadline plus grace
+    period, grading the answers saved so far. Set-based: one claim, one
+    detail grading and one score update for the whole batch. Attempts that
+    were submitted meanwhile or are not yet due are left alone; returns how
+    many were finalised.
+    """
+    if not attempt_ids:
+        return 0
+    
+    # Answers still buffered in this process are written first
+    rows = []
+    for attempt_id in attempt_ids:
+        rows.extend(
+            {"attempt_id": attempt_id, "question_id": question_id, "chosen_option": chosen_option}
+            for question_id, chosen_option in autosave_buffer.take(attempt_id).items()
+        )
+    if rows:
+        detail = models.QuizAttemptDetail
+        stmt = pg_insert(detail)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["attempt_id", "question_id"],
+            set_={"chosen_option": stmt.excluded.chosen_option},
+            where=detail.is_correct.is_(None)
+        )
+        db.execute(stmt, rows)
+    
+    params = {
+        "attempt_ids": list(attempt_ids),
+        "now": datetime.utcnow(),
+        "grace": timedelta(seconds=GRACE_SECONDS)
+    }
+    # The status condition makes concurrent sweeps and submits claim each attempt once
+    claimed = db.execute(text("""
+        UPDATE quiz_attempt a
+        SET status = 'completed',
+            finished_at = LEAST(a.started_at + make_interval(mins => COALESCE(q.duration_minutes, 30)), q.end_time)
+        FROM quiz q
+        WHERE q.quiz_id = a.quiz_id
+          AND a.attempt_id = ANY(:attempt_ids)
+          AND a.status = 'in_progress'
+          AND LEAST(a.started_at + make_interval(mins => COALESCE(q.duration_minutes, 30)), q.end_time) + :grace <= :now
+        RETURNING a.attempt_id
+    """), params).scalars().all()
+    
+    if claimed:
+        params = {"attempt_ids": claimed}
+        db.execute(text(f"""
+            UPDATE quiz_attempt_detail d
+            SET is_correct = {_IS_CORRECT_SQL}
+            FROM quiz_question qq
+            WHERE qq.question_id = d.question_id AND d.attempt_id = ANY(:attempt_ids)
+        """), params)
+        db.execute(text("""
+            UPDATE quiz_attempt a
+            SET total_score = s.score
+            FROM (
+                SELECT a2.attempt_id,
+                       COALESCE(SUM(COALESCE(NULLIF(qq.points, 0), 1)) FILTER (WHERE d.is_correct), 0) AS score
+                FROM quiz_attempt a2
+                LEFT JOIN quiz_attempt_detail d ON d.attempt_id = a2.attempt_id
+                LEFT JOIN quiz_question qq ON qq.question_id = d.question_id
+                WHERE a2.attempt_id = ANY(:attempt_ids)
+                GROUP BY a2.attempt_id
+            ) s
+            WHERE a.attempt_id = s.attempt_id
+        """), params)
+    db.commit()
+    
+    for attempt_id in attempt_ids:
+        attempt_expiry.cancel(attempt_id)
+    return len(claimed)
+
+
+def sweep_expired_attempts(db: Session) -> int:
+    """
+    One indexed pass over in-progress attempts: finalise those past their
+    deadline in batches and queue the deadlines of the rest. Run on startup
+    and periodically for attempts started by other API processes.
+    """
+    rows = db.execute(text("""
+        SELECT a.attempt_id,
+               LEAST(a.started_at + make_interval(mins => COALESCE(q.duration_minutes, 30)), q.end_time) AS deadline
+        FROM quiz_attempt a
+        JOIN quiz q ON q.quiz_id = a.quiz_id
+        WHERE a.status = 'in_progress'
+    """)).all()
+    
+    cutoff = datetime.utcnow() - timedelta(seconds=GRACE_SECONDS)
+    expired = []
+    for attempt_id, deadline in rows:
+        if deadline is None:
+            continue
+        if deadline <= cutoff:
+            expired.append(attempt_id)
+        else:
+            attempt_expiry.schedule(attempt_id, deadline)
+    
+    finalised = 0
+    for start in range(0, len(expired), attempt_expiry.batch_size):
+        finalised += expire_attempts(db, expired[start:start + attempt_expiry.batch_size])
+    return finalised
+
+
+def regrade_quiz(db: Session, quiz_id: int) -> Optional[schemas.QuizRegradeResult]:
+    """
+    Rescore every completed attempt of a quiz against its current questions,
+    e.g. after a correct_option was fixed. Two set-based statements in one
+    transaction; only attempts whose score changed are reported.
+    """
+    quiz = db.query(models.Quiz.quiz_id).filter(models.Quiz.quiz_id == quiz_id).with_for_update().first()
+    if not quiz:
+        return None
+    
+    params = {"quiz_id": quiz_id}
+    answers_changed = db.execute(text(f"""
+        UPDATE quiz_attempt_detail d
+        SET is_correct = {_IS_CORRECT_SQL}
+        FROM quiz_question qq, quiz_attempt a
+        WHERE qq.question_id = d.question_id
+          AND a.attempt_id = d.attempt_id
+          AND a.quiz_id = :quiz_id
+          AND a.status = 'completed'
+          AND d.is_correct IS DISTINCT FROM ({_IS_CORRECT_SQL})
+    """), params).rowcount
+    
+    # Joining the table to itself exposes the pre-update score to RETURNING
+    changed = db.execute(text("""
+        UPDATE quiz_attempt a
+        SET total_score = s.new_score
+        FROM (
+            SELECT a2.attempt_id,
+                   COALESCE(SUM(COALESCE(NULLIF(qq.points, 0), 1)) FILTER (WHERE d.is_correct), 0) AS new_score
+            FROM quiz_attempt a2
+            LEFT JOIN quiz_attempt_detail d ON d.attempt_id = a2.attempt_id
+            LEFT JOIN quiz_question qq ON qq.question_id = d.question_id
+            WHERE a2.quiz_id = :quiz_id AND a2.status = 'completed'
+            GROUP BY a2.attempt_id
+        ) s, quiz_attempt old
+        WHERE a.attempt_id = s.attempt_id
+          AND old.attempt_id = a.attempt_id
+          AND a.total_score IS DISTINCT FROM s.new_score
+        RETURNING a.attempt_id, a.student_id, old.total_score AS old_score, a.total_score AS new_score
+    """), params).all()
+    
+    attempts_regraded = db.query(func.count(models.QuizAttempt.attempt_id)).filter(
+        models.QuizAttempt.quiz_id == quiz_id,
+        models.QuizAttempt.status == "completed"
+    ).scalar()
+    db.commit()
+    
+    changes = [
+        schemas.QuizRegradeChange(
+            attempt_id=row.attempt_id,
+            student_id=row.student_id,
+            old_score=float(row.old_score) if row.old_score is not None else None,
+            new_score=float(row.new_score),
+            delta=float(row.new_score - (row.old_score or 0))
+        )
+        for row in sorted(changed, key=lambda row: row.attempt_id)
+    ]
+    return schemas.QuizRegradeResult(
+        quiz_id=quiz_id,
+        attempts_regraded=attempts_regraded or 0,
+        answers_changed=answers_changed,
+        attempts_changed=len(changes),
+        total_delta=round(sum(change.delta for change in changes), 2),
+        changes=changes
+    )
+
+
 def get_quiz_attempt(db: Session, attempt_id: int) -> Optional[schemas.QuizAttemptResult]:
     """Get quiz attempt results"""
     attempt = db.query(models.QuizAttempt).filter(
@@ -297,11 +729,9 @@ def get_quiz_attempt(db: Session, attempt_id: int) -> Optional[schemas.QuizAttem
     if not attempt:
         return None
     
-    questions = db.query(models.QuizQuestion).filter(
-        models.QuizQuestion.quiz_id == attempt.quiz_id
-    ).all()
-    
-    max_score = sum(float(q.points) if q.points else 1.0 for q in questions)
+    quiz = attempt.quiz
+    question_count = quiz.question_count if quiz else 0
+    max_score = float(quiz.max_score or 0) if quiz else 0.0
     
     # Count correct answers from details
     correct_count = db.query(models.QuizAttemptDetail).filter(
@@ -315,7 +745,7 @@ def get_quiz_attempt(db: Session, attempt_id: int) -> Optional[schemas.QuizAttem
     return schemas.QuizAttemptResult(
         attempt_id=attempt.attempt_id,
         quiz_id=attempt.quiz_id,
-        total_questions=len(questions),
+        total_questions=question_count,
         correct_answers=correct_count,
         total_score=total_score,
         max_score=max_score,
@@ -324,170 +754,267 @@ def get_quiz_attempt(db: Session, attempt_id: int) -> Optional[schemas.QuizAttem
     )
 
 
-def get_student_quiz_attempts(db: Session, student_id: int, quiz_id: Optional[int] = None) -> List[schemas.QuizAttemptSummary]:
-    """Get all quiz attempts for a student"""
-    query = db.query(models.QuizAttempt).filter(
-        models.QuizAttempt.student_id == student_id
-    )
-    
-    if quiz_id:
-        query = query.filter(models.QuizAttempt.quiz_id == quiz_id)
-    
-    attempts = query.order_by(models.QuizAttempt.started_at.desc()).all()
-    
-    result = []
-    for attempt in attempts:
-        quiz = attempt.quiz
-        
+# Rows fetched per round trip when streaming attempt summaries
+SUMMARY_YIELD_PER = 500
+
+
+def iter_attempt_summaries(
+    db: Session,
+    student_id: Optional[int] = None,
+    quiz_id: Optional[int] = None,
+    course_id: Optional[int] = None,
+    status: Optional[str] = None,
+    started_from: Optional[datetime] = None,
+    started_to: Optional[datetime] = None,
+    include_student: bool = False
+) -> Iterator[schemas.QuizAttemptSummary]:
+    """
+    Attempt summaries, newest first, from one query joining the quiz (and
+    optionally the student) with the quiz's stored max_score. Rows are
+    streamed with yield_per instead of being loaded all at once.
+    """
+    attempt = models.QuizAttempt
+    columns = [
+        attempt.attempt_id,
+        attempt.quiz_id,
+        attempt.started_at,
+        attempt.finished_at,
+        attempt.total_score,
+        attempt.status,
+        models.Quiz.title,
+        models.Quiz.max_score
+    ]
+    if include_student:
+        columns += [models.Student.student_id, models.Student.lname, models.Student.mname, models.Student.fname]
+    
+    query = db.query(*columns).join(models.Quiz, models.Quiz.quiz_id == attempt.quiz_id)
+    if include_student:
+        query = query.outerjoin(models.Student, models.Student.user_id == attempt.student_id)
+    if student_id is not None:
+        query = query.filter(attempt.student_id == student_id)
+    if quiz_id is not None:
+        query = query.filter(attempt.quiz_id == quiz_id)
+    if course_id is not None:
+        query = query.filter(models.Quiz.course_id == course_id)
+    if status:
+        query = query.filter(attempt.status == status)
+    if started_from is not None:
+        query = query.filter(attempt.started_at >= started_from)
+    if started_to is not None:
+        query = query.filter(attempt.started_at < started_to)
+    
+    rows = query.order_by(attempt.started_at.desc(), attempt.attempt_id.desc()).yield_per(SUMMARY_YIELD_PER)
+    for row in rows:
         # Calculate duration
         duration_seconds = 0
-        if attempt.started_at and attempt.finished_at:
-            duration = attempt.finished_at - attempt.started_at
-            duration_seconds = int(duration.total_seconds())
+        if row.started_at and row.finished_at:
+            duration_seconds = int((row.finished_at - row.started_at).total_seconds())
         
-        # Calculate max score from quiz questions
-        questions = db.query(models.QuizQuestion).filter(
-            models.QuizQuestion.quiz_id == attempt.quiz_id
-        ).all()
-        max_score = sum(float(q.points) if q.points else 1.0 for q in questions)
+        max_score = float(row.max_score or 0)
+        total_score = float(row.total_score) if row.total_score else 0.0
+        percentage = (total_score / max_score * 100) if max_score > 0 else 0.0
+        
+        summary = schemas.QuizAttemptSummary(
+            attempt_id=row.attempt_id,
+            quiz_id=row.quiz_id,
+            quiz_title=row.title,
+            started_at=row.started_at,
+            finished_at=row.finished_at,
+            total_score=total_score,
+            max_score=max_score,
+            percentage=round(percentage, 2),
+            duration_seconds=duration_seconds,
+            status=row.status or "unknown"
+        )
+        if include_student:
+            summary.student_id = row.student_id
+            summary.student_name = (
+                f"{row.lname} {row.mname or ''} {row.fname}".strip() if row.lname else "Unknown"
+            )
+        yield summary
+
+
+def get_student_quiz_attempts(
+    db: Session,
+    student_id: int,
+    quiz_id: Optional[int] = None,
+    course_id: Optional[int] = None,
+    status: Optional[str] = None,
+    started_from: Optional[datetime] = None,
+    started_to: Optional[datetime] = None
+) -> List[schemas.QuizAttemptSummary]:
+    """Get all quiz attempts for a student"""
+    return list(iter_attempt_summaries(
+        db,
+        student_id=student_id,
+        quiz_id=quiz_id,
+        course_id=course_id,
+        status=status,
+        started_from=started_from,
+        started_to=started_to
+    ))
+
+
+def _assemble_attempt_details(db: Session, attempts: List[models.QuizAttempt]) -> List[schemas.QuizAttemptDetail]:
+    """
+    Review payloads for attempts whose quiz is loaded: two more queries in
+    total (questions of all their quizzes, answers of all attempts), then
+    O(questions) per attempt via dict lookups.
+    """
+    attempts = [attempt for attempt in attempts if attempt.quiz]
+    if not attempts:
+        return []
+    
+    questions_by_quiz = {}
+    for question in db.query(models.QuizQuestion).filter(
+        models.QuizQuestion.quiz_id.in_({attempt.quiz_id for attempt in attempts})
+    ).order_by(models.QuizQuestion.question_id):
+        questions_by_quiz.setdefault(question.quiz_id, []).append(question)
+    
+    detail = models.QuizAttemptDetail
+    answer_map = {
+        (row.attempt_id, row.question_id): row
+        for row in db.query(detail.attempt_id, detail.question_id, detail.chosen_option, detail.is_correct).filter(
+            detail.attempt_id.in_([attempt.attempt_id for attempt in attempts])
+        )
+    }
+    
+    results = []
+    for attempt in attempts:
+        questions = questions_by_quiz.get(attempt.quiz_id, [])
+        answers = []
+        max_score = 0.0
+        for question in questions:
+            points = float(question.points) if question.points else 1.0
+            max_score += points
+            
+            # The student's answer for this question
+            answer_detail = answer_map.get((attempt.attempt_id, question.question_id))
+            
+            answers.append(schemas.QuizAttemptAnswerDetail(
+                question_id=question.question_id,
+                question_text=question.question_text,
+                option_a=question.option_a,
+                option_b=question.option_b,
+                option_c=question.option_c,
+                option_d=question.option_d,
+                chosen_option=(answer_detail.chosen_option or "") if answer_detail else "",
+                correct_option=question.correct_option,
+                is_correct=bool(answer_detail.is_correct) if answer_detail else False,
+                points=points
+            ))
         
         total_score = float(attempt.total_score) if attempt.total_score else 0.0
+        correct_count = sum(1 for a in answers if a.is_correct)
         percentage = (total_score / max_score * 100) if max_score > 0 else 0.0
         
-        result.append(schemas.QuizAttemptSummary(
+        results.append(schemas.QuizAttemptDetail(
             attempt_id=attempt.attempt_id,
             quiz_id=attempt.quiz_id,
-            quiz_title=quiz.title if quiz else "Unknown Quiz",
-            started_at=attempt.started_at,
-            finished_at=attempt.finished_at,
+            quiz_title=attempt.quiz.title,
+            total_questions=len(questions),
+            correct_answers=correct_count,
             total_score=total_score,
             max_score=max_score,
             percentage=round(percentage, 2),
-            duration_seconds=duration_seconds,
-            status=attempt.status or "unknown"
+            status=attempt.status or "unknown",
+            started_at=attempt.started_at,
+            finished_at=attempt.finished_at,
+            answers=answers
         ))
-    
-    return result
+    return results
 
 
 def get_quiz_attempt_detail(db: Session, attempt_id: int) -> Optional[schemas.QuizAttemptDetail]:
     """Get detailed quiz attempt with all answers for review"""
-    attempt = db.query(models.QuizAttempt).filter(
+    attempt = db.query(models.QuizAttempt).options(joinedload(models.QuizAttempt.quiz)).filter(
         models.QuizAttempt.attempt_id == attempt_id
     ).first()
     
     if not attempt:
         return None
     
-    quiz = attempt.quiz
-    if not quiz:
-        return None
-    
-    # Get all questions for the quiz
-    questions = db.query(models.QuizQuestion).filter(
-        models.QuizQuestion.quiz_id == attempt.quiz_id
-    ).all()
-    
-    question_map = {q.question_id: q for q in questions}
-    
-    # Get all answer details for this attempt
-    answer_details = db.query(models.QuizAttemptDetail).filter(
-        models.QuizAttemptDetail.attempt_id == attempt_id
-    ).all()
-    
-    answers = []
-    max_score = 0.0
-    
-    for question in questions:
-        points = float(question.points) if question.points else 1.0
-        max_score += points
-        
-        # Find the student's answer for this question
-        answer_detail = next(
-            (ad for ad in answer_details if ad.question_id == question.question_id),
-            None
-        )
-        
-        answers.append(schemas.QuizAttemptAnswerDetail(
-            question_id=question.question_id,
-            question_text=question.question_text,
-            option_a=question.option_a,
-            option_b=question.option_b,
-            option_c=question.option_c,
-            option_d=question.option_d,
-            chosen_option=answer_detail.chosen_option if answer_detail else "",
-            correct_option=question.correct_option,
-            is_correct=answer_detail.is_correct if answer_detail else False,
-            points=points
-        ))
-    
-    total_score = float(attempt.total_score) if attempt.total_score else 0.0
-    correct_count = sum(1 for a in answers if a.is_correct)
-    percentage = (total_score / max_score * 100) if max_score > 0 else 0.0
-    
-    return schemas.QuizAttemptDetail(
-        attempt_id=attempt.attempt_id,
-        quiz_id=attempt.quiz_id,
-        quiz_title=quiz.title,
-        total_questions=len(questions),
-        correct_answers=correct_count,
-        total_score=total_score,
-        max_score=max_score,
-        percentage=round(percentage, 2),
-        status=attempt.status or "unknown",
-        started_at=attempt.started_at,
-        finished_at=attempt.finished_at,
-        answers=answers
-    )
+    details = _assemble_attempt_details(db, [attempt])
+    return details[0] if details else None
 
 
-def get_quiz_all_attempts(db: Session, quiz_id: int) -> List[schemas.QuizAttemptSummary]:
+def get_quiz_attempt_details(
+    db: Session,
+    attempt_ids: Optional[List[int]] = None,
+    quiz_id: Optional[int] = None
+) -> List[schemas.QuizAttemptDetail]:
+    """Review payloads for many attempts (by id and/or whole quiz) in three queries, ordered by attempt id"""
+    query = db.query(models.QuizAttempt).options(joinedload(models.QuizAttempt.quiz))
+    if attempt_ids is not None:
+        query = query.filter(models.QuizAttempt.attempt_id.in_(attempt_ids))
+    if quiz_id is not None:
+        query = query.filter(models.QuizAttempt.quiz_id == quiz_id)
+    return _assemble_attempt_details(db, query.order_by(models.QuizAttempt.attempt_id).all())
+
+
+def get_quiz_all_attempts(
+    db: Session,
+    quiz_id: int,
+    status: Optional[str] = None,
+    started_from: Optional[datetime] = None,
+    started_to: Optional[datetime] = None
+) -> List[schemas.QuizAttemptSummary]:
     """Get all attempts for a specific quiz with student information"""
-    attempts = db.query(models.QuizAttempt).filter(
-        models.QuizAttempt.quiz_id == quiz_id
-    ).order_by(models.QuizAttempt.started_at.desc()).all()
-    
-    result = []
-    for attempt in attempts:
-        # Get student info using student_id from attempt
-        student = db.query(models.Student).filter(
-            models.Student.user_id == attempt.student_id
-        ).first()
-        
-        # Build student name from student record
-        student_name = "Unknown"
-        if student:
-            student_name = f"{student.lname} {student.mname or ''} {student.fname}".strip()
-        
-        # Calculate duration
-        duration_seconds = 0
-        if attempt.started_at and attempt.finished_at:
-            duration = attempt.finished_at - attempt.started_at
-            duration_seconds = int(duration.total_seconds())
-        
-        # Get quiz for max score
-        quiz = db.query(models.Quiz).filter(models.Quiz.quiz_id == quiz_id).first()
-        questions = db.query(models.QuizQuestion).filter(
-            models.QuizQuestion.quiz_id == quiz_id
-        ).all()
-        max_score = sum(float(q.points) if q.points else 1.0 for q in questions)
-        
-        total_score = float(attempt.total_score) if attempt.total_score else 0.0
-        percentage = (total_score / max_score * 100) if max_score > 0 else 0.0
-        
-        result.append(schemas.QuizAttemptSummary(
-            attempt_id=attempt.attempt_id,
-            quiz_id=attempt.quiz_id,
-            quiz_title=quiz.title if quiz else "Unknown Quiz",
-            student_id=student.student_id if student else None,
-            student_name=student_name,
-            started_at=attempt.started_at,
-            finished_at=attempt.finished_at,
-            total_score=total_score,
-            max_score=max_score,
-            percentage=round(percentage, 2),
-            duration_seconds=duration_seconds,
-            status=attempt.status or "in_progress"
-        ))
+    return list(iter_attempt_summaries(
+        db,
+        quiz_id=quiz_id,
+        status=status,
+        started_from=started_from,
+        started_to=started_to,
+        include_student=True
+    ))
+
+
+def get_item_analysis(db: Session, quiz_id: int) -> Optional[schemas.QuizItemAnalysis]:
+    """Per-question difficulty, discrimination and option frequencies plus Cronbach's alpha"""
+    if not db.query(models.Quiz.quiz_id).filter(models.Quiz.quiz_id == quiz_id).first():
+        return None
     
+    attempt = models.QuizAttempt
+    completed = (attempt.quiz_id == quiz_id, attempt.status == "completed")
+    attempt_count, last_attempt_id = db.query(
+        func.count(attempt.attempt_id), func.max(attempt.attempt_id)
+    ).filter(*completed).one()
+    
+    # Reuse the last result until attempts are added or the answer key changes
+    key = answer_keys.get(db, quiz_id)
+    fingerprint = (attempt_count, last_attempt_id, key.loaded_at)
+    cached = item_analysis.item_analysis_cache.get(quiz_id, fingerprint)
+    if cached is not None:
+        return cached
+    
+    attempt_ids = db.query(
+        func.array_agg(aggregate_order_by(attempt.attempt_id, attempt.attempt_id))
+    ).filter(*completed).scalar() or []
+    
+    # Every answer of every completed attempt, as three parallel arrays in one row
+    detail = models.QuizAttemptDetail
+    chosen = func.upper(func.coalesce(detail.chosen_option, ""))
+    option_code = case(
+        (chosen == "", 0),
+        (chosen == "A", 1),
+        (chosen == "B", 2),
+        (chosen == "C", 3),
+        (chosen == "D", 4),
+        else_=5
+    )
+    detail_attempts, detail_questions, detail_codes = db.query(
+        func.array_agg(detail.attempt_id),
+        func.array_agg(detail.question_id),
+        func.array_agg(option_code)
+    ).join(attempt, attempt.attempt_id == detail.attempt_id).filter(*completed).one()
+    
+    result = schemas.QuizItemAnalysis(**item_analysis.analyse(
+        key,
+        attempt_ids,
+        detail_attempts or [],
+        detail_questions or [],
+        detail_codes or []
+    ))
+    item_analysis.item_analysis_cache.put(quiz_id, fingerprint, result)
     return result
@@ -1,12 +1,20 @@
+import os
 from datetime import datetime
+from decimal import Decimal
 from typing import List, Optional
 
-from sqlalchemy import func
+from sqlalchemy import case, exists, func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 from app import models, schemas
+from app.crud import courses as course_crud
+from app.crud import quizzes as quiz_crud
+from app.student_dashboard import dashboard_cache
 import json
 
+GPA_CREDITS_INTERVAL_SECONDS = int(os.getenv("GPA_HISTORY_CREDITS_INTERVAL_SECONDS", "3600"))
+
 
 def _full_name(student: models.Student) -> str:
     return " ".join(filter(None, [student.fname, student.lname, student.mname]))
@@ -72,8 +80,6 @@ def set_target_gpa(
     if not student:
         return None
 
-    from decimal import Decimal
-
     student.target_gpa = Decimal(str(target_gpa))
     db.commit()
     db.refresh(student)
@@ -84,46 +90,59 @@ def set_target_gpa(
 def get_dashboard_stats(
     db: Session, student_id: int
 ) -> Optional[schemas.DashboardStats]:
-    student = _find_student(db, student_id)
-    if not student:
+    """Dashboard figures from one query, cached briefly per student"""
+    cached = dashboard_cache.get(student_id)
+    if cached is not None:
+        return cached
+    generation = dashboard_cache.generation
+
+    # Same lookup as _find_student: student number first, then user id
+    row = db.execute(
+        text("""
+            WITH s AS (
+                SELECT user_id, current_gpa, target_gpa
+                FROM student
+                WHERE student_id = :student_id OR user_id = :student_id
+                ORDER BY (student_id = :student_id) DESC
+                LIMIT 1
+            )
+            SELECT s.user_id,
+                   s.current_gpa,
+                   s.target_gpa,
+                   (SELECT COUNT(*) FROM enroll e WHERE e.student_id = s.user_id) AS courses_enrolled,
+                   (SELECT COUNT(*) FROM submission sub WHERE sub.student_id = s.user_id) AS submissions,
+                   (SELECT AVG(sub.score) FROM submission sub WHERE sub.student_id = s.user_id) AS average_score,
+                   p.predicted_gpa,
+                   p.recommendations
+            FROM s
+            LEFT JOIN LATERAL (
+                SELECT predicted_gpa, recommendations
+                FROM prediction
+                WHERE user_id = s.user_id
+                ORDER BY prediction_id DESC
+                LIMIT 1
+            ) p ON TRUE
+        """),
+        {"student_id": student_id},
+    ).first()
+    if not row:
         return None
-    user_id = student.user_id
-
-    courses_enrolled = (
-        db.query(models.Enroll).filter(models.Enroll.student_id == user_id).count()
-    )
-    submissions = (
-        db.query(models.Submission)
-        .filter(models.Submission.student_id == user_id)
-        .count()
-    )
-    avg_score = (
-        db.query(func.avg(models.Submission.score))
-        .filter(models.Submission.student_id == user_id)
-        .scalar()
-    )
-    avg_score_val = float(avg_score) if avg_score is not None else None
 
-    prediction = (
-        db.query(models.Prediction)
-        .filter(models.Prediction.user_id == user_id)
-        .order_by(models.Prediction.prediction_id.desc())
-        .first()
-    )
-
-    return schemas.DashboardStats(
-        courses_enrolled=courses_enrolled,
-        submissions=submissions,
-        average_score=avg_score_val,
-        current_gpa=float(student.current_gpa)
-        if student.current_gpa is not None
+    stats = schemas.DashboardStats(
+        courses_enrolled=row.courses_enrolled,
+        submissions=row.submissions,
+        average_score=float(row.average_score)
+        if row.average_score is not None
         else None,
-        predicted_gpa=float(prediction.predicted_gpa) if prediction else None,
-        target_gpa=float(student.target_gpa)
-        if student.target_gpa is not None
+        current_gpa=float(row.current_gpa) if row.current_gpa is not None else None,
+        predicted_gpa=float(row.predicted_gpa)
+        if row.predicted_gpa is not None
         else None,
-        recommendations=prediction.recommendations if prediction else None,
+        target_gpa=float(row.target_gpa) if row.target_gpa is not None else None,
+        recommendations=row.recommendations,
     )
+    dashboard_cache.put(student_id, row.user_id, stats, generation)
+    return stats
 
 
 def get_student_courses(db: Session, student_id: int) -> List[schemas.CourseSummary]:
@@ -132,52 +151,94 @@ def get_student_courses(db: Session, student_id: int) -> List[schemas.CourseSumm
     if not student:
         return []
 
-    enrollments = (
-        db.query(models.Enroll)
-        .filter(models.Enroll.student_id == student.user_id)
+    return course_crud.list_course_summaries(db, student_user_id=student.user_id)
+
+
+def backfill_gpa_history(db: Session) -> int:
+    """
+    Copy the legacy student.gpa_history JSON into the gpa_history table for
+    students that have no rows yet, then fill missing credits from enrollments.
+    Safe to run on every startup; returns the number of rows inserted.
+
+    The API does not compute semester GPAs itself: gpa_history rows come
+    from this backfill and from direct imports (e.g. DB/sample_data.py).
+    Credits of rows added later are filled by fill_gpa_history_credits.
+    """
+    students = (
+        db.query(models.Student.user_id, models.Student.gpa_history, models.Student.entrance_year)
+        .filter(models.Student.gpa_history.isnot(None))
+        .filter(
+            ~exists().where(models.GpaHistory.student_id == models.Student.user_id)
+        )
         .all()
     )
-    result = []
 
-    for enroll in enrollments:
-        course = enroll.course
-        if course:
-            lecturer_name = None
-            if course.lecturer:
-                lecturer_name = " ".join(
-                    filter(
-                        None,
-                        [
-                            course.lecturer.title,
-                            course.lecturer.fname,
-                            course.lecturer.lname,
-                            course.lecturer.mname,
-                        ],
-                    )
-                )
-
-            enrolled_count = (
-                db.query(models.Enroll)
-                .filter(models.Enroll.course_id == course.course_id)
-                .count()
+    rows = []
+    entrance_years = []
+    for user_id, raw, entrance_year in students:
+        # gpa_history có thể đang là dict hoặc string JSON
+        try:
+            data = json.loads(raw) if isinstance(raw, str) else raw
+        except ValueError:
+            continue
+        if not isinstance(data, dict):
+            continue
+        for item in data.get("semesters") or []:
+            try:
+                gpa = round(float(item["gpa"]), 2)
+            except (KeyError, TypeError, ValueError):
+                continue
+            if not item.get("semester"):
+                continue
+            rows.append(
+                {
+                    "student_id": user_id,
+                    "semester": item["semester"],
+                    "semester_gpa": Decimal(str(gpa)),
+                }
             )
-
-            result.append(
-                schemas.CourseSummary(
-                    id=course.course_id,
-                    image_url=getattr(course, "image_url", None),
-                    code=course.course_code,
-                    name=course.course_name,
-                    credits=course.credits,
-                    semester=course.semester,
-                    capacity=course.capacity,
-                    lecturer_name=lecturer_name,
-                    enrolled_count=enrolled_count,
-                    description=course.description,
+        if entrance_year is None and data.get("entrance_year") is not None:
+            try:
+                entrance_years.append(
+                    {"user_id": user_id, "entrance_year": int(data["entrance_year"])}
                 )
-            )
+            except (TypeError, ValueError):
+                pass
+
+    inserted = 0
+    for start in range(0, len(rows), 1000):
+        stmt = pg_insert(models.GpaHistory).values(rows[start:start + 1000])
+        stmt = stmt.on_conflict_do_nothing(index_elements=["student_id", "semester"])
+        inserted += db.execute(stmt).rowcount or 0
+    if entrance_years:
+        db.bulk_update_mappings(models.Student, entrance_years)
+    db.commit()
 
-    return result
+    fill_gpa_history_credits(db)
+    return inserted
+
+
+def fill_gpa_history_credits(db: Session) -> None:
+    """Set credits on gpa_history rows that have none, from the student's enrollments"""
+    # Tín chỉ mỗi kỳ = tổng tín chỉ các môn đã đăng ký trong kỳ đó
+    db.execute(
+        text("""
+            UPDATE gpa_history g
+            SET credits = t.credits
+            FROM (
+                SELECT e.student_id,
+                       COALESCE(e.semester, c.semester) AS semester,
+                       SUM(c.credits) AS credits
+                FROM enroll e
+                JOIN course c ON c.course_id = e.course_id
+                GROUP BY e.student_id, COALESCE(e.semester, c.semester)
+            ) t
+            WHERE g.credits IS NULL
+              AND g.student_id = t.student_id
+              AND g.semester = t.semester
+        """)
+    )
+    db.commit()
 
 
 def get_gpa_history(
@@ -189,85 +250,160 @@ def get_gpa_history(
         .filter(models.Student.user_id == student_user_id)
         .first()
     )
-    if not student or not student.gpa_history:
+    if not student:
         return None
 
-    # gpa_history có thể đang là dict hoặc string JSON
-    raw = student.gpa_history
-    if isinstance(raw, str):
-        raw = json.loads(raw)
-
-    entrance_year = raw.get("entrance_year")
-    semesters = raw.get("semesters", [])
-
-    points: list[schemas.GPAHistoryPoint] = []
-    total = 0.0
-    for idx, item in enumerate(semesters):
-        gpa = float(item.get("gpa", 0.0))
-        total += gpa
-        overall = total / (idx + 1)
+    # GPA tích lũy (trung bình các kỳ) và GPA tích lũy theo tín chỉ tới từng kỳ
+    rows = db.execute(
+        text("""
+            SELECT semester,
+                   semester_gpa,
+                   credits,
+                   AVG(semester_gpa) OVER w AS overall_gpa,
+                   SUM(semester_gpa * credits) OVER w
+                       / NULLIF(SUM(credits) OVER w, 0) AS weighted_gpa
+            FROM gpa_history
+            WHERE student_id = :student_id
+            WINDOW w AS (ORDER BY semester ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW)
+            ORDER BY semester
+        """),
+        {"student_id": student_user_id},
+    ).all()
+    if not rows:
+        return None
 
-        points.append(
+    return schemas.GPAHistoryResponse(
+        entrance_year=student.entrance_year,
+        points=[
             schemas.GPAHistoryPoint(
-                semester=item.get("semester", ""),
-                semester_gpa=round(gpa, 2),
-                overall_gpa=round(overall, 2),
+                semester=row.semester,
+                semester_gpa=round(float(row.semester_gpa), 2),
+                overall_gpa=round(float(row.overall_gpa), 2),
+                credits=row.credits,
+                weighted_gpa=round(float(row.weighted_gpa), 2)
+                if row.weighted_gpa is not None
+                else None,
             )
-        )
+            for row in rows
+        ],
+    )
 
-    return schemas.GPAHistoryResponse(
+
+def get_gpa_trends(
+    db: Session, major: Optional[str] = None, entrance_year: Optional[int] = None
+) -> schemas.GPATrendResponse:
+    """Per-semester averages of semester, cumulative and credit-weighted GPA for a cohort"""
+    filters = []
+    params = {}
+    if major is not None:
+        filters.append("s.major = :major")
+        params["major"] = major
+    if entrance_year is not None:
+        filters.append("s.entrance_year = :entrance_year")
+        params["entrance_year"] = entrance_year
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+    rows = db.execute(
+        text(f"""
+            WITH cumulative AS (
+                SELECT g.semester,
+                       g.semester_gpa,
+                       AVG(g.semester_gpa) OVER w AS overall_gpa,
+                       SUM(g.semester_gpa * g.credits) OVER w
+                           / NULLIF(SUM(g.credits) OVER w, 0) AS weighted_gpa
+                FROM gpa_history g
+                JOIN student s ON s.user_id = g.student_id
+                {where}
+                WINDOW w AS (
+                    PARTITION BY g.student_id ORDER BY g.semester
+                    ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                )
+            )
+            SELECT semester,
+                   COUNT(*) AS student_count,
+                   AVG(semester_gpa) AS average_semester_gpa,
+                   AVG(overall_gpa) AS average_overall_gpa,
+                   AVG(weighted_gpa) AS average_weighted_gpa
+            FROM cumulative
+            GROUP BY semester
+            ORDER BY semester
+        """),
+        params,
+    ).all()
+
+    return schemas.GPATrendResponse(
+        major=major,
         entrance_year=entrance_year,
-        points=points,
+        points=[
+            schemas.GPATrendPoint(
+                semester=row.semester,
+                student_count=row.student_count,
+                average_semester_gpa=round(float(row.average_semester_gpa), 2),
+                average_overall_gpa=round(float(row.average_overall_gpa), 2),
+                average_weighted_gpa=round(float(row.average_weighted_gpa), 2)
+                if row.average_weighted_gpa is not None
+                else None,
+            )
+            for row in rows
+        ],
     )
 
 
 def get_student_assignments(
-    db: Session, student_id: int
+    db: Session,
+    student_id: int,
+    course_id: Optional[int] = None,
+    status: Optional[str] = None,
+    upcoming_only: bool = False,
 ) -> List[schemas.AssignmentWithStatus]:
-    """Get all assignments for courses the student is enrolled in"""
+    """
+    Get all assignments for courses the student is enrolled in, with the
+    student's submission status, from one left-join query. Optionally
+    limited to one course, one status ("pending", "submitted", "graded")
+    or assignments whose deadline has not passed.
+    """
     student = _find_student(db, student_id)
     if not student:
         return []
 
-    # Get enrolled course IDs
-    enrolled_course_ids = (
-        db.query(models.Enroll.course_id)
-        .filter(models.Enroll.student_id == student.user_id)
-        .all()
+    enrolled_course_ids = db.query(models.Enroll.course_id).filter(
+        models.Enroll.student_id == student.user_id
     )
-    course_ids = [c[0] for c in enrolled_course_ids]
 
-    if not course_ids:
-        return []
-
-    assignments = (
-        db.query(models.Assignment)
-        .filter(models.Assignment.course_id.in_(course_ids))
-        .order_by(models.Assignment.deadline)
-        .all()
+    # One row per assignment even if the student submitted more than once
+    submissions = (
+        db.query(
+            models.Submission.assignment_id,
+            func.count(models.Submission.submission_id).label("submission_count"),
+            func.max(models.Submission.score).label("score"),
+        )
+        .filter(models.Submission.student_id == student.user_id)
+        .group_by(models.Submission.assignment_id)
+        .subquery()
+    )
+    submission_status = case(
+        (submissions.c.submission_count.is_(None), "pending"),
+        (submissions.c.score.is_(None), "submitted"),
+        else_="graded",
     )
 
-    result = []
-    for assignment in assignments:
-        # Check submission status
-        submission = (
-            db.query(models.Submission)
-            .filter(
-                models.Submission.assignment_id == assignment.assignment_id,
-                models.Submission.student_id == student.user_id,
-            )
-            .first()
+    query = (
+        db.query(models.Assignment, submission_status.label("status"), submissions.c.score)
+        .outerjoin(
+            submissions,
+            submissions.c.assignment_id == models.Assignment.assignment_id,
         )
+        .filter(models.Assignment.course_id.in_(enrolled_course_ids))
+    )
+    if course_id is not None:
+        query = query.filter(models.Assignment.course_id == course_id)
+    if status:
+        query = query.filter(submission_status == status)
+    if upcoming_only:
+        query = query.filter(models.Assignment.deadline >= datetime.utcnow())
 
-        status = "pending"
-        score = None
-        if submission:
-            if submission.score is not None:
-                status = "graded"
-                score = float(submission.score)
-            else:
-                status = "submitted"
-
+    result = []
+    for assignment, status_value, score in query.order_by(models.Assignment.deadline):
         result.append(
             schemas.AssignmentWithStatus(
                 id=assignment.assignment_id,
@@ -279,8 +415,8 @@ def get_student_assignments(
                 if assignment.max_score
                 else 100.0,
                 created_at=assignment.created_at,
-                submission_status=status,
-                score=score,
+                submission_status=status_value,
+                score=float(score) if score is not None else None,
             )
         )
 
@@ -443,12 +579,6 @@ def get_student_quizzes(db: Session, student_id: int) -> List[schemas.QuizSummar
 
     result = []
     for quiz in quizzes:
-        question_count = (
-            db.query(models.QuizQuestion)
-            .filter(models.QuizQuestion.quiz_id == quiz.quiz_id)
-            .count()
-        )
-
         result.append(
             schemas.QuizSummary(
                 id=quiz.quiz_id,
@@ -459,7 +589,8 @@ def get_student_quizzes(db: Session, student_id: int) -> List[schemas.QuizSummar
                 max_attempts=quiz.max_attempts or 1,
                 start_time=quiz.start_time,
                 end_time=quiz.end_time,
-                question_count=question_count,
+                question_count=quiz.question_count or 0,
+                max_score=float(quiz.max_score or 0),
             )
         )
 
@@ -474,29 +605,7 @@ def get_student_quiz_attempts(
     if not student:
         return []
 
-    attempts = (
-        db.query(models.QuizAttempt)
-        .filter(models.QuizAttempt.student_id == student.user_id)
-        .order_by(models.QuizAttempt.started_at.desc())
-        .all()
-    )
-
-    result = []
-    for attempt in attempts:
-        quiz = attempt.quiz
-        result.append(
-            schemas.QuizAttemptSummary(
-                attempt_id=attempt.attempt_id,
-                quiz_id=attempt.quiz_id,
-                quiz_title=quiz.title if quiz else "Unknown Quiz",
-                started_at=attempt.started_at,
-                finished_at=attempt.finished_at,
-                total_score=float(attempt.total_score) if attempt.total_score else None,
-                status=attempt.status or "unknown",
-            )
-        )
-
-    return result
+    return list(quiz_crud.iter_attempt_summaries(db, student_id=student.user_id))
 
 
 def create_prediction_for_student(
@@ -561,8 +670,6 @@ def create_prediction_for_student(
     )
 
     # Step 4: Save to database
-    from decimal import Decimal
-
     prediction_record = models.Prediction(
         user_id=student.user_id,
         predicted_gpa=Decimal(str(round(predicted_gpa, 2))),
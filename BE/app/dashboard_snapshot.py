@@ -0,0 +1,135 @@
+"""
+Dashboard Snapshot Module
+
+Keeps the manager dashboard counters in a single `dashboard_snapshot` row.
+Every ORM flush that adds or removes students, lecturers, courses or
+enrollments applies its delta to the row in the same transaction, and a
+periodic reconcile recounts everything to correct drift from writes made
+outside the ORM (seed scripts, database cascades, bulk updates).
+"""
+
+import logging
+import os
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict
+
+from sqlalchemy import event, func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, attributes
+
+from app import models
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_ID = 1
+RECONCILE_INTERVAL_SECONDS = int(os.getenv("DASHBOARD_RECONCILE_SECONDS", "300"))
+
+
+def reconcile_snapshot(db: Session) -> models.DashboardSnapshot:
+    """Recount every dashboard figure from the base tables and store it."""
+    counts = db.query(
+        db.query(func.count(models.Student.user_id)).scalar_subquery().label("total_students"),
+        db.query(func.count(models.Lecturer.user_id)).scalar_subquery().label("total_lecturers"),
+        db.query(func.count(models.Course.course_id)).scalar_subquery().label("total_courses"),
+        db.query(func.count(models.Enroll.enroll_id)).filter(
+            models.Enroll.status == "active"
+        ).scalar_subquery().label("active_enrollments"),
+        db.query(func.coalesce(func.sum(models.Student.current_gpa), 0)).scalar_subquery().label("gpa_sum"),
+        db.query(func.count(models.Student.current_gpa)).scalar_subquery().label("gpa_count"),
+    ).one()
+
+    now = datetime.utcnow()
+    values = {
+        "total_students": counts.total_students,
+        "total_lecturers": counts.total_lecturers,
+        "total_courses": counts.total_courses,
+        "active_enrollments": counts.active_enrollments,
+        "gpa_sum": counts.gpa_sum,
+        "gpa_count": counts.gpa_count,
+        "updated_at": now,
+        "reconciled_at": now,
+    }
+    stmt = pg_insert(models.DashboardSnapshot).values(snapshot_id=SNAPSHOT_ID, **values)
+    stmt = stmt.on_conflict_do_update(index_elements=["snapshot_id"], set_=values)
+    db.execute(stmt)
+    db.commit()
+
+    return db.get(models.DashboardSnapshot, SNAPSHOT_ID, populate_existing=True)
+
+
+def get_snapshot(db: Session) -> models.DashboardSnapshot:
+    """Read the snapshot row by primary key, building it on first use."""
+    snapshot = db.get(models.DashboardSnapshot, SNAPSHOT_ID)
+    if snapshot is None:
+        snapshot = reconcile_snapshot(db)
+    return snapshot
+
+
+def _decimal(value) -> Decimal:
+    return Decimal(str(value)) if value is not None else Decimal("0")
+
+
+def _collect_deltas(session: Session) -> Dict[str, object]:
+    """Work out how pending inserts, deletes and updates move the counters."""
+    deltas: Dict[str, object] = {
+        "total_students": 0,
+        "total_lecturers": 0,
+        "total_courses": 0,
+        "active_enrollments": 0,
+        "gpa_sum": Decimal("0"),
+        "gpa_count": 0,
+    }
+
+    for obj, sign in [(o, 1) for o in session.new] + [(o, -1) for o in session.deleted]:
+        if isinstance(obj, models.Student):
+            deltas["total_students"] += sign
+            deltas["gpa_sum"] += sign * _decimal(obj.current_gpa)
+            if obj.current_gpa is not None:
+                deltas["gpa_count"] += sign
+        elif isinstance(obj, models.Lecturer):
+            deltas["total_lecturers"] += sign
+        elif isinstance(obj, models.Course):
+            deltas["total_courses"] += sign
+            if sign < 0:
+                # Enrollments go with the course through ON DELETE CASCADE
+                deltas["active_enrollments"] -= session.query(func.count(models.Enroll.enroll_id)).filter(
+                    models.Enroll.course_id == obj.course_id,
+                    models.Enroll.status == "active"
+                ).scalar() or 0
+        elif isinstance(obj, models.Enroll):
+            if (obj.status or "active") == "active":
+                deltas["active_enrollments"] += sign
+
+    for obj in session.dirty:
+        if isinstance(obj, models.Student):
+            history = attributes.get_history(obj, "current_gpa")
+            if history.has_changes():
+                old = history.deleted[0] if history.deleted else None
+                new = history.added[0] if history.added else None
+                deltas["gpa_sum"] += _decimal(new) - _decimal(old)
+                deltas["gpa_count"] += int(new is not None) - int(old is not None)
+        elif isinstance(obj, models.Enroll):
+            history = attributes.get_history(obj, "status")
+            if history.has_changes():
+                was_active = bool(history.deleted) and history.deleted[0] == "active"
+                is_active = bool(history.added) and history.added[0] == "active"
+                deltas["active_enrollments"] += int(is_active) - int(was_active)
+
+    return {key: value for key, value in deltas.items() if value}
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _apply_snapshot_deltas(session: Session, flush_context, instances) -> None:
+    """Fold this flush's changes into the snapshot inside the same transaction."""
+    deltas = _collect_deltas(session)
+    if not deltas:
+        return
+
+    snapshot = models.DashboardSnapshot
+    values = {key: getattr(snapshot, key) + value for key, value in deltas.items()}
+    values["updated_at"] = datetime.utcnow()
+    session.connection().execute(
+        update(snapshot).where(snapshot.snapshot_id == SNAPSHOT_ID).values(**values)
+    )
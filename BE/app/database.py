@@ -40,20 +40,39 @@ def get_db() -> Generator:
     finally:
         db.close()
 
+# Statement prefixes applied on startup, mapped to their idempotent form
+_IDEMPOTENT_PREFIXES = [
+    ("create table", "CREATE TABLE IF NOT EXISTS"),
+    ("create unique index", "CREATE UNIQUE INDEX IF NOT EXISTS"),
+    ("create index", "CREATE INDEX IF NOT EXISTS"),
+    ("create materialized view", "CREATE MATERIALIZED VIEW IF NOT EXISTS"),
+    # Column additions in LMS.sql are written as ADD COLUMN IF NOT EXISTS
+    ("alter table", "ALTER TABLE"),
+]
+
+
+def _strip_leading_comments(chunk: str) -> str:
+    """Drop the `--` comment lines that precede a statement."""
+    lines = chunk.strip().splitlines()
+    while lines and (not lines[0].strip() or lines[0].strip().startswith("--")):
+        lines.pop(0)
+    return "\n".join(lines).strip()
+
+
 def _prepare_create_statements(raw_sql: str) -> List[str]:
-    """Extract CREATE TABLE statements and make them idempotent."""
+    """Extract CREATE TABLE/INDEX/MATERIALIZED VIEW and ALTER TABLE statements and make them idempotent."""
     statements: List[str] = []
     for chunk in raw_sql.split(";"):
-        cleaned = chunk.strip()
+        cleaned = _strip_leading_comments(chunk)
         if not cleaned:
             continue
         lowered = cleaned.lower()
-        if not lowered.startswith("create table"):
-            # Skip SELECT/TRUNCATE/DROP or incomplete lines in the provided SQL file
-            continue
-        body = cleaned[len("create table") :].strip()
-        fixed = f"CREATE TABLE IF NOT EXISTS {body}"
-        statements.append(fixed + ";")
+        for prefix, replacement in _IDEMPOTENT_PREFIXES:
+            if lowered.startswith(prefix):
+                body = cleaned[len(prefix) :].strip()
+                statements.append(f"{replacement} {body};")
+                break
+        # Anything else (SELECT/TRUNCATE/DROP) is skipped to keep existing data safe
     return statements
 
 
@@ -101,7 +120,7 @@ def sync_sequences() -> None:
 
 def run_schema_sql() -> None:
     """
-    Parse and execute CREATE TABLE statements from DB/LMS.sql.
+    Parse and execute CREATE TABLE/INDEX/MATERIALIZED VIEW and ALTER TABLE statements from DB/LMS.sql.
 
     This function intentionally skips TRUNCATE/DROP/SELECT statements present
     in the SQL file to keep existing data safe.
@@ -116,7 +135,7 @@ def run_schema_sql() -> None:
     raw_sql = schema_path.read_text(encoding="utf-8")
     statements = _prepare_create_statements(raw_sql)
     if not statements:
-        print("[database] No CREATE TABLE statements found in schema.")
+        print("[database] No CREATE statements found in schema.")
         return
 
     with engine.begin() as connection:
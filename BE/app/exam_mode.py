@@ -0,0 +1,231 @@
+"""
+Exam Mode Module
+
+Keeps timed exams responsive when a whole course starts and submits at
+once:
+
+- `quiz_payloads`: pre-warmed student-facing quiz payloads (answers hidden),
+  one per quiz plus one per shuffle variant
+- `admission`: per-quiz cap on concurrent attempt starts, so the start
+  burst queues in the API instead of piling onto the database
+- `autosave_buffer`: in-progress answers held in memory and written to
+  quiz_attempt_detail in batches by the background scheduler
+
+All state is per API process.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple, TypeVar
+
+from sqlalchemy import select, text
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_TTL_SECONDS = int(os.getenv("EXAM_PAYLOAD_TTL_SECONDS", "600"))
+ADMISSION_CONCURRENCY = int(os.getenv("EXAM_ADMISSION_CONCURRENCY", "20"))
+ADMISSION_TIMEOUT_SECONDS = float(os.getenv("EXAM_ADMISSION_TIMEOUT_SECONDS", "10"))
+AUTOSAVE_FLUSH_SECONDS = float(os.getenv("EXAM_AUTOSAVE_FLUSH_SECONDS", "5"))
+AUTOSAVE_BATCH_SIZE = int(os.getenv("EXAM_AUTOSAVE_BATCH_SIZE", "1000"))
+
+T = TypeVar("T")
+
+
+class PayloadCache:
+    """
+    TTL cache of per-quiz payloads; None results are never cached. A quiz
+    can hold several payloads keyed by `variant`, all invalidated together.
+    """
+
+    def __init__(self, ttl_seconds: float = PAYLOAD_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[int, Dict[Optional[int], Tuple[float, object]]] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def get(self, quiz_id: int, loader: Callable[[], Optional[T]], variant: Optional[int] = None) -> Optional[T]:
+        with self._lock:
+            entry = self._entries.get(quiz_id, {}).get(variant)
+            generation = self._generation
+        if entry is not None and time.monotonic() - entry[0] <= self.ttl_seconds:
+            return entry[1]
+
+        payload = loader()
+        if payload is not None:
+            with self._lock:
+                if generation == self._generation:
+                    self._entries.setdefault(quiz_id, {})[variant] = (time.monotonic(), payload)
+        return payload
+
+    def invalidate(self, quiz_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if quiz_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(quiz_id, None)
+
+
+class AdmissionTimeout(Exception):
+    """Raised when a request waited too long for an admission slot."""
+
+
+class AdmissionGate:
+    """At most `concurrency` attempt starts run at once for each quiz."""
+
+    def __init__(self, concurrency: int = ADMISSION_CONCURRENCY, timeout_seconds: float = ADMISSION_TIMEOUT_SECONDS):
+        self.concurrency = concurrency
+        self.timeout_seconds = timeout_seconds
+        self._semaphores: Dict[int, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def admit(self, quiz_id: int) -> Iterator[None]:
+        with self._lock:
+            semaphore = self._semaphores.setdefault(quiz_id, threading.BoundedSemaphore(self.concurrency))
+        if not semaphore.acquire(timeout=self.timeout_seconds):
+            raise AdmissionTimeout(f"Quiz {quiz_id} is busy")
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+class AttemptOwner(NamedTuple):
+    student_id: int
+    quiz_id: int
+
+
+# Buffered answers are only written for attempts still in progress and
+# questions still on the attempt's quiz; anything else is dropped
+_FLUSH_SQL = text("""
+    INSERT INTO quiz_attempt_detail (attempt_id, question_id, chosen_option)
+    SELECT v.attempt_id, v.question_id, v.chosen_option
+    FROM unnest(
+        CAST(:attempt_ids AS INT[]), CAST(:question_ids AS INT[]), CAST(:chosen_options AS TEXT[])
+    ) AS v(attempt_id, question_id, chosen_option)
+    JOIN quiz_attempt a ON a.attempt_id = v.attempt_id AND a.status = 'in_progress'
+    JOIN quiz_question qq ON qq.question_id = v.question_id AND qq.quiz_id = a.quiz_id
+    WHERE length(v.chosen_option) <= 1
+    ON CONFLICT (attempt_id, question_id) DO UPDATE SET chosen_option = EXCLUDED.chosen_option
+    WHERE quiz_attempt_detail.is_correct IS NULL
+""")
+
+
+class AutosaveBuffer:
+    """
+    Latest answer per question for every in-progress attempt. `flush`
+    upserts everything buffered with a few multi-row statements and never
+    writes to attempts that are no longer in progress.
+    """
+
+    def __init__(self, batch_size: int = AUTOSAVE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        # Held for a whole flush so a submit never misses answers in transit
+        self._flush_lock = threading.Lock()
+        self._owners: Dict[int, AttemptOwner] = {}
+        self._pending: Dict[int, Dict[int, str]] = {}
+
+    def register(self, attempt_id: int, student_id: int, quiz_id: int) -> None:
+        with self._lock:
+            self._owners[attempt_id] = AttemptOwner(student_id, quiz_id)
+
+    def owner(self, attempt_id: int) -> Optional[AttemptOwner]:
+        with self._lock:
+            return self._owners.get(attempt_id)
+
+    def save(self, attempt_id: int, answers: Dict[int, str]) -> int:
+        """Buffer answers for a registered attempt; returns how many are buffered for it."""
+        with self._lock:
+            pending = self._pending.setdefault(attempt_id, {})
+            pending.update(answers)
+            return len(pending)
+
+    def peek(self, attempt_id: int) -> Dict[int, str]:
+        """Answers buffered for an attempt and not yet flushed."""
+        with self._lock:
+            return dict(self._pending.get(attempt_id, {}))
+
+    def take(self, attempt_id: int) -> Dict[int, str]:
+        """Remove an attempt from the buffer, e.g. on submit; same result as `peek`."""
+        with self._flush_lock, self._lock:
+            self._owners.pop(attempt_id, None)
+            return self._pending.pop(attempt_id, {})
+
+    @staticmethod
+    def _write(db: Session, rows: List[Tuple[int, int, str]]) -> int:
+        attempt_ids, question_ids, chosen_options = zip(*rows)
+        return db.execute(_FLUSH_SQL, {
+            "attempt_ids": list(attempt_ids),
+            "question_ids": list(question_ids),
+            "chosen_options": list(chosen_options),
+        }).rowcount or 0
+
+    def flush(self, db: Session) -> int:
+        """
+        Write all buffered answers to quiz_attempt_detail; returns the row
+        count. A batch the database rejects (e.g. a question deleted
+        meanwhile) is retried row by row and the failing rows are dropped,
+        so one bad answer never holds back everyone else's.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                owned = list(self._owners)
+            rows = [
+                (attempt_id, question_id, chosen_option)
+                for attempt_id, answers in pending.items()
+                for question_id, chosen_option in answers.items()
+            ]
+            if not rows and not owned:
+                return 0
+
+            written = 0
+            try:
+                for start in range(0, len(rows), self.batch_size):
+                    batch = rows[start:start + self.batch_size]
+                    try:
+                        with db.begin_nested():
+                            written += self._write(db, batch)
+                    except (DataError, IntegrityError):
+                        for row in batch:
+                            try:
+                                with db.begin_nested():
+                                    written += self._write(db, [row])
+                            except (DataError, IntegrityError):
+                                logger.warning(f"Dropping autosaved answer {row}: rejected by the database")
+                # Forget attempts finished elsewhere (submitted on another worker or expired)
+                finished = db.execute(
+                    select(models.QuizAttempt.attempt_id).where(
+                        models.QuizAttempt.attempt_id.in_(owned),
+                        models.QuizAttempt.status != "in_progress"
+                    )
+                ).scalars().all() if owned else []
+                db.commit()
+            except Exception:
+                db.rollback()
+                # Put the answers back without clobbering newer ones saved meanwhile
+                with self._lock:
+                    for attempt_id, answers in pending.items():
+                        self._pending[attempt_id] = {**answers, **self._pending.get(attempt_id, {})}
+                raise
+
+            with self._lock:
+                for attempt_id in finished:
+                    self._owners.pop(attempt_id, None)
+                    self._pending.pop(attempt_id, None)
+            return written
+
+
+# Singleton instances shared by all requests in this process
+quiz_payloads = PayloadCache()
+admission = AdmissionGate()
+autosave_buffer = AutosaveBuffer()
@@ -0,0 +1,138 @@
+"""
+Item Analysis Module
+
+Question-level statistics for a quiz, computed with NumPy over an
+attempts x questions response matrix:
+
+- difficulty: proportion of attempts answering the question correctly
+- discrimination: corrected point-biserial correlation between the item
+  and the rest of the attempt's score
+- option frequencies: share of attempts choosing each option
+- Cronbach's alpha for the quiz as a whole
+
+Correctness is derived from the current answer key, so results follow
+question edits. Results are cached per quiz until the set of completed
+attempts or the answer key changes.
+"""
+
+import threading
+from datetime import datetime
+from typing import Dict, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.answer_keys import AnswerKey
+
+# Response codes stored in the matrix
+OPTION_LABELS = ("blank", "A", "B", "C", "D", "other")
+
+
+def _nullable(value: float) -> Optional[float]:
+    return None if not np.isfinite(value) else round(float(value), 4)
+
+
+def analyse(
+    key: AnswerKey,
+    attempt_ids: Sequence[int],
+    detail_attempt_ids: Sequence[int],
+    detail_question_ids: Sequence[int],
+    detail_codes: Sequence[int]
+) -> dict:
+    """
+    Build the response matrix from parallel detail arrays (as aggregated by
+    Postgres) and compute the statistics. `attempt_ids` lists every
+    completed attempt in ascending order, so attempts without any saved
+    answer count as all blank. Codes index OPTION_LABELS.
+    """
+    attempt_ids = np.asarray(attempt_ids, dtype=np.int64)
+    detail_attempt_ids = np.asarray(detail_attempt_ids, dtype=np.int64)
+    detail_question_ids = np.asarray(detail_question_ids, dtype=np.int64)
+    detail_codes = np.asarray(detail_codes, dtype=np.int16)
+    question_ids = np.asarray(key.question_ids, dtype=np.int64)
+    points = np.asarray(key.points_cents, dtype=np.float64) / 100
+    correct_codes = np.frombuffer(bytes(key.correct_options), dtype=np.uint8).astype(np.int16) - ord("A") + 1
+    n_attempts, n_questions = len(attempt_ids), len(question_ids)
+
+    # Scatter answers into the matrix; details for unknown questions or attempts are dropped
+    codes = np.zeros((n_attempts, n_questions), dtype=np.int16)
+    if n_attempts and n_questions and len(detail_attempt_ids):
+        rows = np.searchsorted(attempt_ids, detail_attempt_ids)
+        cols = np.searchsorted(question_ids, detail_question_ids)
+        rows_clipped = np.minimum(rows, n_attempts - 1)
+        cols_clipped = np.minimum(cols, n_questions - 1)
+        valid = (attempt_ids[rows_clipped] == detail_attempt_ids) & (question_ids[cols_clipped] == detail_question_ids)
+        codes[rows[valid], cols[valid]] = detail_codes[valid]
+
+    correct = (codes == correct_codes).astype(np.float64)
+    item_scores = correct * points
+    totals = item_scores.sum(axis=1)
+
+    difficulty = np.full(n_questions, np.nan)
+    discrimination = np.full(n_questions, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if n_attempts:
+            difficulty = correct.mean(axis=0)
+        if n_attempts > 1:
+            # Corrected point-biserial: each item against the score on the other items
+            rest = totals[:, None] - item_scores
+            item_dev = correct - difficulty
+            rest_dev = rest - rest.mean(axis=0)
+            discrimination = (item_dev * rest_dev).sum(axis=0) / np.sqrt(
+                (item_dev ** 2).sum(axis=0) * (rest_dev ** 2).sum(axis=0)
+            )
+
+        # Count of each response code per question: (len(OPTION_LABELS), n_questions)
+        option_counts = (codes[None, :, :] == np.arange(len(OPTION_LABELS))[:, None, None]).sum(axis=1)
+        option_frequencies = option_counts / n_attempts if n_attempts else np.zeros_like(option_counts, dtype=np.float64)
+
+        alpha = np.nan
+        if n_attempts > 1 and n_questions > 1:
+            total_variance = totals.var(ddof=1)
+            alpha = n_questions / (n_questions - 1) * (1 - item_scores.var(axis=0, ddof=1).sum() / total_variance)
+
+    responses = (codes != 0).sum(axis=0)
+    items = [
+        {
+            "question_id": int(question_ids[j]),
+            "correct_option": chr(key.correct_options[j]),
+            "points": float(points[j]),
+            "responses": int(responses[j]),
+            "difficulty": _nullable(difficulty[j]),
+            "discrimination": _nullable(discrimination[j]),
+            "option_frequencies": {
+                label: round(float(option_frequencies[i, j]), 4) for i, label in enumerate(OPTION_LABELS)
+            },
+        }
+        for j in range(n_questions)
+    ]
+    return {
+        "quiz_id": key.quiz_id,
+        "attempt_count": n_attempts,
+        "question_count": n_questions,
+        "mean_score": _nullable(totals.mean()) if n_attempts else None,
+        "max_score": key.max_score_cents / 100,
+        "cronbach_alpha": _nullable(alpha),
+        "computed_at": datetime.utcnow(),
+        "items": items,
+    }
+
+
+class ItemAnalysisCache:
+    """Latest analysis per quiz, reused while its fingerprint is unchanged."""
+
+    def __init__(self):
+        self._entries: Dict[int, Tuple[Hashable, object]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, quiz_id: int, fingerprint: Hashable) -> Optional[object]:
+        with self._lock:
+            entry = self._entries.get(quiz_id)
+        return entry[1] if entry and entry[0] == fingerprint else None
+
+    def put(self, quiz_id: int, fingerprint: Hashable, result: object) -> None:
+        with self._lock:
+            self._entries[quiz_id] = (fingerprint, result)
+
+
+# Singleton cache shared by all requests in this process
+item_analysis_cache = ItemAnalysisCache()
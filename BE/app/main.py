@@ -1,8 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app import models
-from app.database import engine, run_schema_sql
+from app import attempt_expiry, dashboard_snapshot, exam_mode, models
+from app.crud import analytics as analytics_crud
+from app.crud import messages as message_crud
+from app.crud import quizzes as quiz_crud
+from app.crud import students as student_crud
+from app.database import SessionLocal, engine, run_schema_sql
+from app.scheduler import scheduler
 from app.routers import auth, courses, quizzes, students, lecturers, managers, messages
 
 app = FastAPI(title="Learning Management System API", version="0.1.0")
@@ -24,6 +29,69 @@ def startup_event() -> None:
     # Sync SQLAlchemy models with the database for convenience
     models.Base.metadata.create_all(bind=engine)
 
+    # Rebuild maintained counters and keep them reconciled
+    db = SessionLocal()
+    try:
+        dashboard_snapshot.reconcile_snapshot(db)
+        message_crud.reconcile_unread_counters(db)
+        quiz_crud.reconcile_quiz_totals(db)
+        quiz_crud.sweep_expired_attempts(db)
+        # Migrate legacy JSON GPA history into the gpa_history table
+        student_crud.backfill_gpa_history(db)
+    finally:
+        db.close()
+    attempt_expiry.attempt_expiry.start(quiz_crud.expire_attempts)
+    scheduler.add_job(
+        "dashboard_snapshot_reconcile",
+        dashboard_snapshot.RECONCILE_INTERVAL_SECONDS,
+        dashboard_snapshot.reconcile_snapshot,
+    )
+    scheduler.add_job(
+        "message_unread_reconcile",
+        message_crud.UNREAD_RECONCILE_INTERVAL_SECONDS,
+        message_crud.reconcile_unread_counters,
+    )
+    scheduler.add_job(
+        "exam_autosave_flush",
+        exam_mode.AUTOSAVE_FLUSH_SECONDS,
+        exam_mode.autosave_buffer.flush,
+        every_process=True,
+    )
+    scheduler.add_job(
+        "quiz_attempt_expiry_sweep",
+        attempt_expiry.SWEEP_INTERVAL_SECONDS,
+        quiz_crud.sweep_expired_attempts,
+    )
+    scheduler.add_job(
+        "message_archive",
+        message_crud.ARCHIVE_INTERVAL_SECONDS,
+        message_crud.archive_messages,
+    )
+    scheduler.add_job(
+        "gpa_history_credits",
+        student_crud.GPA_CREDITS_INTERVAL_SECONDS,
+        student_crud.fill_gpa_history_credits,
+    )
+    scheduler.add_job(
+        "analytics_view_refresh",
+        analytics_crud.REFRESH_INTERVAL_SECONDS,
+        analytics_crud.refresh_views,
+        run_immediately=True,
+    )
+    scheduler.start()
+
+
+@app.on_event("shutdown")
+def shutdown_event() -> None:
+    scheduler.shutdown()
+    attempt_expiry.attempt_expiry.shutdown()
+    # Persist answers still waiting in the autosave buffer
+    db = SessionLocal()
+    try:
+        exam_mode.autosave_buffer.flush(db)
+    finally:
+        db.close()
+
 
 app.include_router(auth.router)
 app.include_router(students.router)
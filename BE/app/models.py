@@ -2,6 +2,7 @@ from datetime import date, datetime
 from sqlalchemy import (
     Boolean,
     Column,
+    Computed,
     Date,
     DateTime,
     DECIMAL,
@@ -11,7 +12,8 @@ from sqlalchemy import (
     Text,
     UniqueConstraint,
 )
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import declarative_base, deferred, relationship
 
 Base = declarative_base()
 
@@ -56,7 +58,9 @@ class Student(Base):
     course_ratings = relationship("CourseRating", back_populates="student")
     attendance_details = relationship("AttendanceDetail", back_populates="student")
 
+    # Legacy JSON history; the gpa_history table is the source of truth
     gpa_history = Column(Text, nullable=True)
+    entrance_year = Column(Integer)
 
 
 class Lecturer(Base):
@@ -190,6 +194,13 @@ class Quiz(Base):
     start_time = Column(DateTime)
     end_time = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Kept in step with quiz_question by the quiz CRUD functions
+    question_count = Column(Integer, nullable=False, default=0)
+    max_score = Column(DECIMAL(8, 2), nullable=False, default=0)
+    # Serve questions and options in a per-attempt order (see app.shuffling)
+    shuffle = Column(Boolean, nullable=False, default=False)
+    # Bumped whenever questions change; cached answer keys are checked against it
+    key_version = Column(Integer, nullable=False, default=0)
 
     course = relationship("Course", back_populates="quizzes")
     questions = relationship("QuizQuestion", back_populates="quiz")
@@ -224,6 +235,8 @@ class QuizAttempt(Base):
     finished_at = Column(DateTime)
     total_score = Column(DECIMAL(5, 2))
     status = Column(String(20), default='in_progress')
+    # Idempotency-Key of the submit that completed the attempt
+    submission_key = Column(String(100))
 
     quiz = relationship("Quiz", back_populates="attempts")
     student = relationship("Student", back_populates="quiz_attempts")
@@ -307,11 +320,41 @@ class Message(Base):
     content = Column(Text, nullable=False)
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Maintained by Postgres; deferred so ordinary message loads skip it
+    content_tsv = deferred(Column(TSVECTOR, Computed("to_tsvector('simple', content)", persisted=True)))
 
     sender = relationship("User", foreign_keys=[sender_id], back_populates="sent_messages")
     receiver = relationship("User", foreign_keys=[receiver_id], back_populates="received_messages")
 
 
+class MessageArchive(Base):
+    __tablename__ = "message_archive"
+
+    message_id = Column(Integer, primary_key=True)
+    sender_id = Column(Integer, ForeignKey("user.user_id", ondelete="CASCADE"), nullable=False)
+    receiver_id = Column(Integer, ForeignKey("user.user_id", ondelete="CASCADE"), nullable=False)
+    content = Column(Text, nullable=False)
+    is_read = Column(Boolean, default=True)
+    created_at = Column(DateTime, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+    content_tsv = deferred(Column(TSVECTOR, Computed("to_tsvector('simple', content)", persisted=True)))
+
+
+class MessageUnreadCounter(Base):
+    __tablename__ = "message_unread_counter"
+
+    user_id = Column(Integer, ForeignKey("user.user_id", ondelete="CASCADE"), primary_key=True)
+    partner_id = Column(Integer, ForeignKey("user.user_id", ondelete="CASCADE"), primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
+
+
+class MessageUnreadTotal(Base):
+    __tablename__ = "message_unread_total"
+
+    user_id = Column(Integer, ForeignKey("user.user_id", ondelete="CASCADE"), primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
+
+
 class AttendanceRecord(Base):
     __tablename__ = "attendance_record"
 
@@ -355,6 +398,15 @@ class Prediction(Base):
     student = relationship("Student", back_populates="predictions")
 
 
+class GpaHistory(Base):
+    __tablename__ = "gpa_history"
+
+    student_id = Column(Integer, ForeignKey("student.user_id", ondelete="CASCADE"), primary_key=True)
+    semester = Column(String(20), primary_key=True)
+    semester_gpa = Column(DECIMAL(3, 2), nullable=False)
+    credits = Column(Integer)
+
+
 class ActivityLog(Base):
     __tablename__ = "activity_log"
 
@@ -377,3 +429,24 @@ class Announcement(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     course = relationship("Course", back_populates="announcements")
+
+
+class DashboardSnapshot(Base):
+    __tablename__ = "dashboard_snapshot"
+
+    snapshot_id = Column(Integer, primary_key=True)
+    total_students = Column(Integer, nullable=False, default=0)
+    total_lecturers = Column(Integer, nullable=False, default=0)
+    total_courses = Column(Integer, nullable=False, default=0)
+    active_enrollments = Column(Integer, nullable=False, default=0)
+    gpa_sum = Column(DECIMAL(14, 2), nullable=False, default=0)
+    gpa_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    reconciled_at = Column(DateTime, default=datetime.utcnow)
+
+
+class AnalyticsRefresh(Base):
+    __tablename__ = "analytics_refresh"
+
+    view_name = Column(String(63), primary_key=True)
+    refreshed_at = Column(DateTime, nullable=False)
@@ -0,0 +1,70 @@
+"""
+Realtime Messaging Module
+
+In-process publish/subscribe hub that pushes message events to users
+connected over WebSocket (see GET /messages/ws).
+
+Events are published from the synchronous CRUD layer, which runs in the
+threadpool, so `publish` hands delivery to the event loop thread. The hub
+only reaches sockets held by the same API process.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per connection before the oldest ones are dropped
+MAX_PENDING_EVENTS = 100
+
+
+class MessageHub:
+    """Fan-out of per-user events to every open connection of that user."""
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        """Register a connection; must be called from the event loop."""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=MAX_PENDING_EVENTS)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        with self._lock:
+            queues = self._subscribers.get(user_id)
+            if queues:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    def is_connected(self, user_id: int) -> bool:
+        with self._lock:
+            return user_id in self._subscribers
+
+    def publish(self, user_id: int, event: dict) -> None:
+        """Queue an event for all of a user's connections. Safe from any thread."""
+        with self._lock:
+            queues = list(self._subscribers.get(user_id, ()))
+        if not queues or self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._deliver, queues, event)
+
+    @staticmethod
+    def _deliver(queues, event: dict) -> None:
+        for queue in queues:
+            if queue.full():
+                # Slow consumer: drop the oldest event rather than block others
+                queue.get_nowait()
+                logger.warning("Dropping realtime event for a slow connection")
+            queue.put_nowait(event)
+
+
+# Singleton hub shared by the CRUD layer and the WebSocket route
+hub = MessageHub()
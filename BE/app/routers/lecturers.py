@@ -1,5 +1,5 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from app import schemas
@@ -154,22 +154,24 @@ def get_at_risk_students(
 @router.get("/{user_id}/attendance-stats", response_model=List[schemas.CourseAttendanceStat])
 def get_attendance_stats(
     user_id: int,
+    max_staleness_seconds: Optional[int] = Query(None, ge=0, description="Refresh analytics older than this outside peak hours"),
     db: Session = Depends(get_db),
     current_user=Depends(auth_crud.get_current_active_user)
 ):
     """Get attendance statistics for lecturer's courses"""
     if current_user.user_id != user_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
-    return lecturer_crud.get_course_attendance_stats(db, user_id)
+    return lecturer_crud.get_course_attendance_stats(db, user_id, max_staleness_seconds)
 
 
 @router.get("/{user_id}/score-stats", response_model=List[schemas.CourseScoreStat])
 def get_score_stats(
     user_id: int,
+    max_staleness_seconds: Optional[int] = Query(None, ge=0, description="Refresh analytics older than this outside peak hours"),
     db: Session = Depends(get_db),
     current_user=Depends(auth_crud.get_current_active_user)
 ):
     """Get quiz and assignment score statistics for lecturer's courses"""
     if current_user.user_id != user_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
-    return lecturer_crud.get_course_score_stats(db, user_id)
+    return lecturer_crud.get_course_score_stats(db, user_id, max_staleness_seconds)
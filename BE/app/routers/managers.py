@@ -1,5 +1,5 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from app import schemas
@@ -140,12 +140,15 @@ def get_all_feedback(
 
 @router.get("/statistics/courses")
 def get_course_statistics(
+    low_enrollment_threshold: int = Query(10, ge=0, description="Courses with fewer enrollments are flagged"),
+    semester: Optional[str] = Query(None, description="Restrict statistics to one semester"),
+    max_staleness_seconds: Optional[int] = Query(None, ge=0, description="Refresh analytics older than this outside peak hours"),
     db: Session = Depends(get_db),
     current_user=Depends(auth_crud.get_current_active_user)
 ):
     """Get course statistics"""
     require_manager(current_user)
-    return manager_crud.get_course_statistics(db)
+    return manager_crud.get_course_statistics(db, low_enrollment_threshold, semester, max_staleness_seconds)
 
 
 @router.get("/statistics/gpa")
@@ -1,11 +1,14 @@
+import asyncio
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app import schemas
 from app.crud import auth as auth_crud
 from app.crud import messages as message_crud
-from app.database import get_db
+from app.database import SessionLocal, get_db
+from app.realtime import hub
 
 router = APIRouter(prefix="/messages", tags=["messages"])
 
@@ -20,6 +23,37 @@ def get_messages(
     return message_crud.get_messages(db, current_user.user_id, other_user_id)
 
 
+@router.get("/page", response_model=schemas.MessagePage)
+def list_messages(
+    other_user_id: Optional[int] = Query(None, description="Filter messages by conversation partner"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user=Depends(auth_crud.get_current_active_user)
+):
+    """Get a page of messages for the current user, newest first"""
+    try:
+        return message_crud.list_messages(db, current_user.user_id, other_user_id, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+@router.get("/search", response_model=schemas.MessageSearchPage)
+def search_messages(
+    q: str = Query(..., min_length=1, max_length=200, description="Search terms; supports \"phrases\", or and -exclusions"),
+    other_user_id: Optional[int] = Query(None, description="Only search the conversation with this user"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user=Depends(auth_crud.get_current_active_user)
+):
+    """Search the current user's messages, best matches first"""
+    try:
+        return message_crud.search_messages(db, current_user.user_id, q, other_user_id, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
 @router.post("", response_model=schemas.Message, status_code=status.HTTP_201_CREATED)
 def send_message(
     payload: schemas.MessageCreate,
@@ -62,8 +96,86 @@ def mark_messages_read(
 
 @router.get("/users", response_model=List[schemas.UserListItem])
 def get_available_users(
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=500),
     db: Session = Depends(get_db),
     current_user=Depends(auth_crud.get_current_active_user)
 ):
     """Get list of users available to message"""
-    return message_crud.get_available_users(db, current_user.user_id)
+    return message_crud.get_available_users(db, current_user.user_id, skip, limit)
+
+
+@router.get("/users/search", response_model=List[schemas.UserListItem])
+def search_recipients(
+    q: Optional[str] = Query(None, max_length=100, description="Prefix of a name word, username or email; accents optional"),
+    role: Optional[str] = Query(None, pattern="^(student|lecturer|manager)$"),
+    course_id: Optional[int] = Query(None, description="Only students and the lecturer of this course"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user=Depends(auth_crud.get_current_active_user)
+):
+    """Typeahead search for message recipients"""
+    return message_crud.search_recipients(db, current_user.user_id, q, role, course_id, limit)
+
+
+def _authenticate_socket(token: str) -> Optional[int]:
+    db = SessionLocal()
+    try:
+        user = auth_crud.get_user_from_token(db, token)
+        return user.user_id if user else None
+    finally:
+        db.close()
+
+
+def _inbox_snapshot(user_id: int) -> dict:
+    db = SessionLocal()
+    try:
+        return {
+            "type": "snapshot",
+            "unread_count": message_crud.get_unread_count(db, user_id),
+            "conversations": [
+                c.model_dump(mode="json") for c in message_crud.get_conversations(db, user_id)
+            ],
+        }
+    finally:
+        db.close()
+
+
+@router.websocket("/ws")
+async def messages_socket(websocket: WebSocket, token: str = Query(...)):
+    """
+    Push new messages, read events and unread counts to the connected user.
+
+    Browsers cannot set headers on WebSocket requests, so the access token
+    is passed as a query parameter. The first event is a snapshot of the
+    inbox; clients may send "ping" to receive {"type": "pong"}.
+    """
+    user_id = await run_in_threadpool(_authenticate_socket, token)
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    queue = hub.subscribe(user_id)
+
+    async def forward_events():
+        while True:
+            await websocket.send_json(await queue.get())
+
+    async def read_client():
+        while True:
+            if await websocket.receive_text() == "ping":
+                await websocket.send_json({"type": "pong"})
+
+    tasks = []
+    try:
+        await websocket.send_json(await run_in_threadpool(_inbox_snapshot, user_id))
+        tasks = [asyncio.create_task(forward_events()), asyncio.create_task(read_client())]
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        hub.unsubscribe(user_id, queue)
@@ -1,14 +1,19 @@
+from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query
 from sqlalchemy.orm import Session
 
 from app import schemas
 from app.crud import auth as auth_crud
 from app.crud import quizzes as quiz_crud
 from app.database import get_db
+from app.exam_mode import AdmissionTimeout
 
 router = APIRouter(prefix="/quizzes", tags=["quizzes"])
 
+# Upper bound on attempts reviewed per batch request
+MAX_REVIEW_BATCH = 500
+
 
 @router.get("", response_model=List[schemas.QuizSummary])
 def list_quizzes(
@@ -37,11 +42,12 @@ def create_quiz(
 def submit_quiz(
     attempt_id: int,
     payload: schemas.QuizSubmission,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=100),
     db: Session = Depends(get_db),
     current_user=Depends(auth_crud.get_current_active_user)
 ):
-    """Submit answers for a quiz attempt"""
-    result = quiz_crud.submit_quiz_attempt(db, attempt_id, payload)
+    """Submit answers for a quiz attempt; retries with the same Idempotency-Key return the stored result"""
+    result = quiz_crud.submit_quiz_attempt(db, attempt_id, payload, idempotency_key)
     if not result:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
@@ -50,6 +56,68 @@ def submit_quiz(
     return result
 
 
+@router.put("/attempts/{attempt_id}/answers", response_model=schemas.QuizAutosaveResult)
+def autosave_answers(
+    attempt_id: int,
+    payload: schemas.QuizSubmission,
+    db: Session = Depends(get_db),
+    current_user=Depends(auth_crud.get_current_active_user)
+):
+    """Autosave answers for an in-progress attempt (written to the database in batches)"""
+    try:
+        result = quiz_crud.save_attempt_answers(db, attempt_id, current_user.user_id, payload)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not result:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="In-progress attempt not found")
+    return result
+
+
+@router.get("/attempts/{attempt_id}/answers", response_model=List[schemas.QuizAnswer])
+def get_saved_answers(
+    attempt_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(auth_crud.get_current_active_user)
+):
+    """Get the answers saved so far for an in-progress attempt"""
+    result = quiz_crud.get_attempt_answers(db, attempt_id, current_user.user_id)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="In-progress attempt not found")
+    return result
+
+
+@router.get("/attempts/{attempt_id}/questions", response_model=schemas.QuizDetail)
+def get_attempt_questions(
+    attempt_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(auth_crud.get_current_active_user)
+):
+    """Get the quiz as served to this attempt (questions and options shuffled when enabled)"""
+    result = quiz_crud.get_attempt_quiz(db, attempt_id, current_user.user_id)
+    if not result:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attempt not found")
+    return result
+
+
+@router.get("/attempts/details", response_model=List[schemas.QuizAttemptDetail])
+def get_attempt_details(
+    attempt_id: List[int] = Query(..., description="Attempt ids to review (repeat the parameter)"),
+    db: Session = Depends(get_db),
+    current_user=Depends(auth_crud.get_current_active_user)
+):
+    """Get review details for many attempts at once (lecturer only)"""
+    role = (current_user.role or "").lower()
+    if role not in {"lecturer", "manager"}:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    if len(attempt_id) > MAX_REVIEW_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_REVIEW_BATCH} attempts per request"
+        )
+    
+    return quiz_crud.get_quiz_attempt_details(db, attempt_ids=attempt_id)
+
+
 @router.get("/attempts/{attempt_id}/detail", response_model=schemas.QuizAttemptDetail)
 def get_attempt_detail(
     attempt_id: int,
@@ -80,15 +148,54 @@ def get_attempt(
 def get_student_attempts(
     student_id: int,
     quiz_id: Optional[int] = Query(None),
+    course_id: Optional[int] = Query(None),
+    attempt_status: Optional[str] = Query(None, alias="status"),
+    started_from: Optional[datetime] = Query(None),
+    started_to: Optional[datetime] = Query(None),
     db: Session = Depends(get_db),
     current_user=Depends(auth_crud.get_current_active_user)
 ):
-    """Get all quiz attempts for a student"""
+    """Get all quiz attempts for a student, optionally filtered by quiz, course, status and start date"""
     role = (current_user.role or "").lower()
     if current_user.user_id != student_id and role not in {"lecturer", "manager"}:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
     
-    return quiz_crud.get_student_quiz_attempts(db, student_id, quiz_id)
+    return quiz_crud.get_student_quiz_attempts(
+        db, student_id, quiz_id, course_id, attempt_status, started_from, started_to
+    )
+
+
+@router.put("/questions/{question_id}", response_model=schemas.QuizQuestion)
+def update_question(
+    question_id: int,
+    payload: schemas.QuizQuestionUpdate,
+    db: Session = Depends(get_db),
+    current_user=Depends(auth_crud.get_current_active_user)
+):
+    """Update a quiz question (lecturer only)"""
+    role = (current_user.role or "").lower()
+    if role not in {"lecturer", "manager"}:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only lecturers can edit questions")
+    
+    question = quiz_crud.update_quiz_question(db, question_id, payload)
+    if not question:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Question not found")
+    return question
+
+
+@router.delete("/questions/{question_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_question(
+    question_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(auth_crud.get_current_active_user)
+):
+    """Delete a quiz question (lecturer only)"""
+    role = (current_user.role or "").lower()
+    if role not in {"lecturer", "manager"}:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only lecturers can delete questions")
+    
+    if not quiz_crud.delete_quiz_question(db, question_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Question not found")
 
 
 # ============ Quiz ID routes (parameterized, must be after specific routes) ============
@@ -110,16 +217,50 @@ def get_quiz(
 
 @router.get("/{quiz_id}/attempts", response_model=List[schemas.QuizAttemptSummary])
 def get_quiz_attempts(
+    quiz_id: int,
+    attempt_status: Optional[str] = Query(None, alias="status"),
+    started_from: Optional[datetime] = Query(None),
+    started_to: Optional[datetime] = Query(None),
+    db: Session = Depends(get_db),
+    current_user=Depends(auth_crud.get_current_active_user)
+):
+    """Get all attempts for a quiz, optionally filtered by status and start date (lecturer only)"""
+    role = (current_user.role or "").lower()
+    if role not in {"lecturer", "manager"}:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    
+    return quiz_crud.get_quiz_all_attempts(db, quiz_id, attempt_status, started_from, started_to)
+
+
+@router.get("/{quiz_id}/attempts/details", response_model=List[schemas.QuizAttemptDetail])
+def get_quiz_attempt_details(
     quiz_id: int,
     db: Session = Depends(get_db),
     current_user=Depends(auth_crud.get_current_active_user)
 ):
-    """Get all attempts for a quiz (lecturer only)"""
+    """Get review details for every attempt of a quiz (lecturer only)"""
     role = (current_user.role or "").lower()
     if role not in {"lecturer", "manager"}:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
     
-    return quiz_crud.get_quiz_all_attempts(db, quiz_id)
+    return quiz_crud.get_quiz_attempt_details(db, quiz_id=quiz_id)
+
+
+@router.get("/{quiz_id}/item-analysis", response_model=schemas.QuizItemAnalysis)
+def get_item_analysis(
+    quiz_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(auth_crud.get_current_active_user)
+):
+    """Question-level statistics over all completed attempts (lecturer only)"""
+    role = (current_user.role or "").lower()
+    if role not in {"lecturer", "manager"}:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    
+    result = quiz_crud.get_item_analysis(db, quiz_id)
+    if not result:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found")
+    return result
 
 
 @router.post("/{quiz_id}/questions", response_model=schemas.QuizQuestion, status_code=status.HTTP_201_CREATED)
@@ -140,6 +281,40 @@ def add_question(
     return question
 
 
+@router.post("/{quiz_id}/regrade", response_model=schemas.QuizRegradeResult)
+def regrade_quiz(
+    quiz_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(auth_crud.get_current_active_user)
+):
+    """Rescore all completed attempts against the current answer key (lecturer only)"""
+    role = (current_user.role or "").lower()
+    if role not in {"lecturer", "manager"}:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only lecturers can regrade quizzes")
+    
+    result = quiz_crud.regrade_quiz(db, quiz_id)
+    if not result:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found")
+    return result
+
+
+@router.post("/{quiz_id}/exam/prewarm", response_model=schemas.QuizSummary)
+def prewarm_exam(
+    quiz_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(auth_crud.get_current_active_user)
+):
+    """Load a quiz's payload and answer key into memory before an exam starts (lecturer only)"""
+    role = (current_user.role or "").lower()
+    if role not in {"lecturer", "manager"}:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    
+    quiz = quiz_crud.prewarm_quiz(db, quiz_id)
+    if not quiz:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found")
+    return quiz
+
+
 @router.post("/{quiz_id}/start", response_model=schemas.QuizAttemptResult)
 def start_quiz(
     quiz_id: int,
@@ -151,10 +326,17 @@ def start_quiz(
     if role != "student":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only students can take quizzes")
     
-    attempt = quiz_crud.start_quiz_attempt(db, quiz_id, current_user.user_id)
+    try:
+        attempt = quiz_crud.start_quiz_attempt(db, quiz_id, current_user.user_id)
+    except AdmissionTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many students are starting this quiz. Please retry shortly.",
+            headers={"Retry-After": "2"}
+        )
     if not attempt:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
-            detail="Cannot start quiz. You may have reached the maximum number of attempts."
+            detail="Cannot start quiz. You may have reached the maximum number of attempts or the quiz has closed."
         )
     return attempt
\ No newline at end of file
@@ -1,5 +1,5 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from app import schemas
@@ -11,6 +11,22 @@ from app.database import get_db
 router = APIRouter(prefix="/students", tags=["students"])
 
 
+@router.get("/gpa-trends", response_model=schemas.GPATrendResponse)
+def get_gpa_trends(
+    major: Optional[str] = Query(None),
+    entrance_year: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+    current_user=Depends(auth_crud.get_current_active_user),
+):
+    """Average semester, cumulative and credit-weighted GPA per semester for a cohort"""
+    role = (current_user.role or "").lower()
+    if role not in {"lecturer", "manager", "admin"}:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized"
+        )
+    return student_crud.get_gpa_trends(db, major=major, entrance_year=entrance_year)
+
+
 @router.get("/{student_id}/gpa-history", response_model=schemas.GPAHistoryResponse)
 def get_student_gpa_history(
     student_id: int,
@@ -81,6 +97,11 @@ def get_student_courses(
 )
 def get_student_assignments(
     student_id: int,
+    course_id: Optional[int] = Query(None),
+    submission_status: Optional[str] = Query(
+        None, alias="status", pattern="^(pending|submitted|graded)$"
+    ),
+    upcoming: bool = Query(False, description="Only assignments whose deadline has not passed"),
     db: Session = Depends(get_db),
     current_user=Depends(auth_crud.get_current_active_user),
 ):
@@ -89,7 +110,13 @@ def get_student_assignments(
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized"
         )
-    return student_crud.get_student_assignments(db, student_id)
+    return student_crud.get_student_assignments(
+        db,
+        student_id,
+        course_id=course_id,
+        status=submission_status,
+        upcoming_only=upcoming,
+    )
 
 
 @router.get("/{student_id}/grades", response_model=List[schemas.Grade])
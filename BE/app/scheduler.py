@@ -0,0 +1,111 @@
+"""
+Background Scheduler Module
+
+Runs periodic maintenance jobs (snapshot reconciles, view refreshes, ...)
+on a daemon thread inside the API process. Each job receives its own
+database session.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Set SCHEDULER_ENABLED=0 on extra API workers so jobs run in one process only;
+# jobs registered with every_process=True (flushing per-process buffers) still run
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") not in {"0", "false", "False"}
+
+
+class PeriodicJob:
+    """A named function run every `interval_seconds` with a fresh session."""
+
+    def __init__(
+        self,
+        name: str,
+        interval_seconds: float,
+        func: Callable[[Session], None],
+        run_immediately: bool = False,
+        every_process: bool = False,
+    ):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.every_process = every_process
+        self.next_run = time.monotonic() + (0 if run_immediately else interval_seconds)
+
+    def run(self) -> None:
+        db = SessionLocal()
+        try:
+            self.func(db)
+        except Exception:
+            db.rollback()
+            logger.exception(f"Scheduled job '{self.name}' failed")
+        finally:
+            db.close()
+            self.next_run = time.monotonic() + self.interval_seconds
+
+
+class Scheduler:
+    """Minimal in-process scheduler for periodic jobs."""
+
+    def __init__(self):
+        self._jobs: List[PeriodicJob] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_job(
+        self,
+        name: str,
+        interval_seconds: float,
+        func: Callable[[Session], None],
+        run_immediately: bool = False,
+        every_process: bool = False,
+    ) -> None:
+        """Register a job; replaces any existing job with the same name."""
+        with self._lock:
+            self._jobs = [job for job in self._jobs if job.name != name]
+            self._jobs.append(PeriodicJob(name, interval_seconds, func, run_immediately, every_process))
+        self._wakeup.set()
+
+    def _active_jobs(self) -> List[PeriodicJob]:
+        with self._lock:
+            return [job for job in self._jobs if SCHEDULER_ENABLED or job.every_process]
+
+    def start(self) -> None:
+        if not self._active_jobs() or (self._thread and self._thread.is_alive()):
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="lms-scheduler", daemon=True)
+        self._thread.start()
+        logger.info("Background scheduler started")
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            now = time.monotonic()
+            for job in self._active_jobs():
+                if job.next_run <= now and not self._stopped.is_set():
+                    job.run()
+
+            next_run = min((job.next_run for job in self._active_jobs()), default=None)
+            timeout = None if next_run is None else max(0.0, next_run - time.monotonic())
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+
+# Singleton instance shared by all modules
+scheduler = Scheduler()
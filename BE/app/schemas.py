@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
@@ -100,13 +100,30 @@ class GPAHistoryPoint(BaseModel):
     semester: str  # "2022-1"
     semester_gpa: float  # GPA của kỳ đó
     overall_gpa: float  # GPA tích lũy tới kỳ đó
+    credits: Optional[int] = None  # Tín chỉ của kỳ đó
+    weighted_gpa: Optional[float] = None  # GPA tích lũy theo tín chỉ
 
 
 class GPAHistoryResponse(BaseModel):
-    entrance_year: int
+    entrance_year: Optional[int] = None
     points: list[GPAHistoryPoint]
 
 
+# Xu hướng GPA của một nhóm sinh viên theo từng kỳ
+class GPATrendPoint(BaseModel):
+    semester: str
+    student_count: int
+    average_semester_gpa: float
+    average_overall_gpa: float
+    average_weighted_gpa: Optional[float] = None
+
+
+class GPATrendResponse(BaseModel):
+    major: Optional[str] = None
+    entrance_year: Optional[int] = None
+    points: list[GPATrendPoint]
+
+
 # ============ Lecturer Schemas ============
 class LecturerProfile(BaseModel):
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
@@ -157,6 +174,10 @@ class ManagerDashboardStats(BaseModel):
     total_courses: int
     active_enrollments: int
     average_gpa: Optional[float] = None
+    # Snapshot freshness
+    updated_at: Optional[datetime] = None
+    reconciled_at: Optional[datetime] = None
+    staleness_seconds: Optional[float] = None
 
 
 # ============ Course Schemas ============
@@ -289,6 +310,8 @@ class QuizSummary(BaseModel):
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
     question_count: Optional[int] = None
+    max_score: Optional[float] = None
+    shuffle: bool = False
 
 
 class QuizQuestion(BaseModel):
@@ -317,6 +340,7 @@ class QuizCreate(BaseModel):
     max_attempts: int = 1
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
+    shuffle: bool = False
 
 
 class QuizQuestionCreate(BaseModel):
@@ -329,6 +353,16 @@ class QuizQuestionCreate(BaseModel):
     points: float = 1.0
 
 
+class QuizQuestionUpdate(BaseModel):
+    question_text: Optional[str] = None
+    option_a: Optional[str] = None
+    option_b: Optional[str] = None
+    option_c: Optional[str] = None
+    option_d: Optional[str] = None
+    correct_option: Optional[str] = None
+    points: Optional[float] = None
+
+
 class QuizAnswer(BaseModel):
     question_id: int
     chosen_option: str
@@ -339,6 +373,49 @@ class QuizSubmission(BaseModel):
     answers: List[QuizAnswer]
 
 
+class QuizRegradeChange(BaseModel):
+    attempt_id: int
+    student_id: int
+    old_score: Optional[float] = None
+    new_score: float
+    delta: float
+
+
+class QuizRegradeResult(BaseModel):
+    quiz_id: int
+    attempts_regraded: int
+    answers_changed: int
+    attempts_changed: int
+    total_delta: float
+    changes: List[QuizRegradeChange]
+
+
+class QuizItemStatistic(BaseModel):
+    question_id: int
+    correct_option: str
+    points: float
+    responses: int
+    difficulty: Optional[float] = None  # Proportion answering correctly
+    discrimination: Optional[float] = None  # Corrected point-biserial
+    option_frequencies: Dict[str, float]  # A-D plus "blank" and "other"
+
+
+class QuizItemAnalysis(BaseModel):
+    quiz_id: int
+    attempt_count: int
+    question_count: int
+    mean_score: Optional[float] = None
+    max_score: float
+    cronbach_alpha: Optional[float] = None
+    computed_at: datetime
+    items: List[QuizItemStatistic]
+
+
+class QuizAutosaveResult(BaseModel):
+    attempt_id: int
+    saved_answers: int
+
+
 class QuizAttemptResult(BaseModel):
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
@@ -458,6 +535,20 @@ class Message(BaseModel):
     created_at: datetime
 
 
+class MessagePage(BaseModel):
+    items: List[Message]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to load older messages
+
+
+class MessageSearchResult(Message):
+    rank: float
+
+
+class MessageSearchPage(BaseModel):
+    items: List[MessageSearchResult]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to load lower-ranked matches
+
+
 class MessageCreate(BaseModel):
     receiver_id: int
     content: str
@@ -677,6 +768,7 @@ class CourseAttendanceStat(BaseModel):
     course_code: str
     course_name: str
     attendance_rate: float
+    refreshed_at: Optional[datetime] = None
 
 
 class CourseScoreStat(BaseModel):
@@ -687,3 +779,4 @@ class CourseScoreStat(BaseModel):
     course_name: str
     avg_quiz_score: float
     avg_assignment_score: float
+    refreshed_at: Optional[datetime] = None
@@ -0,0 +1,85 @@
+"""
+Question Shuffling Module
+
+Deterministic per-attempt order of questions and answer options for
+quizzes with shuffling enabled. Nothing is stored: the order is derived
+from the attempt id and a per-quiz secret (an HMAC of the quiz id under
+QUIZ_SHUFFLE_SECRET, defaulting to SECRET_KEY), so the payload builder
+and the grader rebuild the same layout independently in O(n).
+
+Attempts are spread over QUIZ_SHUFFLE_VARIANTS layouts per quiz, which
+keeps shuffled payloads cacheable per variant. Stored answers always use
+the canonical option letters; only the letters exchanged with the client
+are in displayed order.
+"""
+
+import hashlib
+import hmac
+import os
+import random
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+SHUFFLE_SECRET = os.getenv("QUIZ_SHUFFLE_SECRET") or os.getenv("SECRET_KEY", "dev-secret-key")
+SHUFFLE_VARIANTS = max(1, int(os.getenv("QUIZ_SHUFFLE_VARIANTS", "32")))
+
+OPTION_LETTERS = "ABCD"
+
+
+def option_mask(options: Sequence[Optional[str]]) -> int:
+    """Bit i is set when option i (A-D) has text; empty options keep their slot."""
+    mask = 0
+    for i, text in enumerate(options[:len(OPTION_LETTERS)]):
+        if text:
+            mask |= 1 << i
+    return mask
+
+
+def _quiz_secret(quiz_id: int) -> bytes:
+    return hmac.new(SHUFFLE_SECRET.encode(), f"quiz-shuffle:{quiz_id}".encode(), hashlib.sha256).digest()
+
+
+def attempt_variant(quiz_id: int, attempt_id: int) -> int:
+    """Layout variant assigned to an attempt."""
+    digest = hmac.new(_quiz_secret(quiz_id), f"attempt:{attempt_id}".encode(), hashlib.sha256).digest()
+    return int.from_bytes(digest[:8], "big") % SHUFFLE_VARIANTS
+
+
+class Layout(NamedTuple):
+    # Question ids in displayed order
+    order: List[int]
+    # Per question id: displayed option i shows canonical option options[qid][i]
+    options: Dict[int, str]
+
+    def to_canonical(self, question_id: int, letter: Optional[str]) -> Optional[str]:
+        mapping = self.options.get(question_id)
+        if not mapping or not letter or letter.upper() not in OPTION_LETTERS:
+            return letter
+        return mapping[OPTION_LETTERS.index(letter.upper())]
+
+    def to_displayed(self, question_id: int, letter: Optional[str]) -> Optional[str]:
+        mapping = self.options.get(question_id)
+        if not mapping or not letter or letter.upper() not in mapping:
+            return letter
+        return OPTION_LETTERS[mapping.index(letter.upper())]
+
+
+def build_layout(quiz_id: int, variant: int, question_ids: Sequence[int], option_masks: Sequence[int]) -> Layout:
+    """
+    Shuffle question ids (given in ascending order) and, per question, the
+    options that have text. Same inputs always give the same layout.
+    """
+    seed = hmac.new(_quiz_secret(quiz_id), f"variant:{variant}".encode(), hashlib.sha256).digest()
+    rng = random.Random(int.from_bytes(seed, "big"))
+
+    order = list(question_ids)
+    rng.shuffle(order)
+
+    options: Dict[int, str] = {}
+    for question_id, mask in zip(question_ids, option_masks):
+        present = [letter for i, letter in enumerate(OPTION_LETTERS) if mask >> i & 1]
+        rng.shuffle(present)
+        shuffled = iter(present)
+        options[question_id] = "".join(
+            next(shuffled) if mask >> i & 1 else letter for i, letter in enumerate(OPTION_LETTERS)
+        )
+    return Layout(order, options)
@@ -0,0 +1,97 @@
+"""
+Student Dashboard Module
+
+Short-lived per-student cache of the student dashboard, which is the
+landing page of every student login. Entries expire after
+STUDENT_DASHBOARD_TTL_SECONDS and are dropped as soon as a committed ORM
+transaction touches the student's enrollments, submissions (including
+grading), predictions or GPA fields.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.database import SessionLocal
+
+DASHBOARD_TTL_SECONDS = int(os.getenv("STUDENT_DASHBOARD_TTL_SECONDS", "30"))
+
+# Models whose writes change a student's dashboard, with the column naming the student
+_STUDENT_COLUMNS = {
+    models.Enroll: "student_id",
+    models.Submission: "student_id",
+    models.Prediction: "user_id",
+    models.Student: "user_id",
+}
+
+
+class DashboardCache:
+    """
+    Dashboards keyed by the id the client asked for (student number or
+    user id), indexed by user id for invalidation.
+    """
+
+    def __init__(self, ttl_seconds: float = DASHBOARD_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[int, Tuple[float, int, schemas.DashboardStats]] = {}
+        self._keys_by_user: Dict[int, Set[int]] = {}
+        self._lock = threading.Lock()
+        # Bumped by invalidate so a load that raced a write is not cached
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, student_id: int) -> Optional[schemas.DashboardStats]:
+        with self._lock:
+            entry = self._entries.get(student_id)
+        if entry is not None and time.monotonic() - entry[0] <= self.ttl_seconds:
+            return entry[2]
+        return None
+
+    def put(self, student_id: int, user_id: int, stats: schemas.DashboardStats, generation: int) -> None:
+        """Store a dashboard loaded when `generation` was current."""
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[student_id] = (time.monotonic(), user_id, stats)
+            self._keys_by_user.setdefault(user_id, set()).add(student_id)
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                for key in self._keys_by_user.pop(user_id, ()):
+                    self._entries.pop(key, None)
+
+
+# Singleton cache shared by all requests in this process
+dashboard_cache = DashboardCache()
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _collect_dashboard_students(session: Session, flush_context, instances) -> None:
+    """Remember which students this transaction's writes affect."""
+    touched = session.info.setdefault("dashboard_students", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        column = _STUDENT_COLUMNS.get(type(obj))
+        if column is not None and getattr(obj, column, None) is not None:
+            touched.add(getattr(obj, column))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_dashboards(session: Session) -> None:
+    touched = session.info.pop("dashboard_students", None)
+    if touched:
+        dashboard_cache.invalidate(touched)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_dashboard_students(session: Session) -> None:
+    session.info.pop("dashboard_students", None)
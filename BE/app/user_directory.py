@@ -0,0 +1,164 @@
+"""
+User Directory Module
+
+In-memory, prefix-searchable directory of users backing the message
+recipient picker (see GET /messages/users/search).
+
+Every name word, the username and the email are normalised (lowercased,
+Vietnamese accents stripped, đ -> d) and kept in one sorted list of
+(key, user_id) pairs, so a prefix lookup is a binary search followed by a
+short scan. The directory is rebuilt from the database when it is older
+than DIRECTORY_TTL_SECONDS, or on the next search after a committed ORM
+transaction in this process adds, removes or renames a user.
+"""
+
+import bisect
+import os
+import threading
+import time
+import unicodedata
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, attributes
+
+from app import models
+from app.database import SessionLocal
+
+DIRECTORY_TTL_SECONDS = int(os.getenv("USER_DIRECTORY_TTL_SECONDS", "300"))
+
+# Models whose rows feed the directory, with the columns it shows or searches
+_DIRECTORY_COLUMNS = {
+    models.User: ("username", "email", "role"),
+    models.Student: ("fname", "lname", "mname"),
+    models.Lecturer: ("fname", "lname", "mname"),
+    models.Manager: ("name",),
+}
+
+
+class DirectoryEntry(NamedTuple):
+    user_id: int
+    username: Optional[str]
+    email: str
+    role: str
+    full_name: str
+
+
+def normalize(value: Optional[str]) -> str:
+    """Lowercase and strip accents so "Đặng" and "dang" compare equal"""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFD", value.replace("đ", "d").replace("Đ", "D"))
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower().strip()
+
+
+def _search_keys(entry: DirectoryEntry) -> Set[str]:
+    name = normalize(entry.full_name)
+    email = normalize(entry.email)
+    keys = set(name.split())
+    keys.update(filter(None, [name, email, email.split("@", 1)[0], normalize(entry.username)]))
+    return keys
+
+
+class UserDirectory:
+    """Sorted prefix index over every user, swapped atomically on reload."""
+
+    def __init__(self, ttl_seconds: float = DIRECTORY_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: Dict[int, DirectoryEntry] = {}
+        self._keys: List[Tuple[str, int]] = []
+        self._by_name: List[int] = []
+        self._loaded_at: Optional[float] = None
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    def load(self, rows: Iterable) -> None:
+        """Rebuild from rows with user_id, username, email, role and full_name"""
+        entries = {
+            row.user_id: DirectoryEntry(row.user_id, row.username, row.email, row.role, row.full_name)
+            for row in rows
+        }
+        keys = sorted((key, user_id) for user_id, entry in entries.items() for key in _search_keys(entry))
+        by_name = sorted(entries, key=lambda user_id: (normalize(entries[user_id].full_name), user_id))
+        with self._lock:
+            self._entries, self._keys, self._by_name = entries, keys, by_name
+            self._loaded_at = time.monotonic()
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        limit: int = 10,
+        accept: Optional[Callable[[DirectoryEntry], bool]] = None
+    ) -> List[DirectoryEntry]:
+        """
+        Top `limit` users where every query word prefixes one of their keys.
+        Results follow key order; with no query they follow name order.
+        """
+        with self._lock:
+            entries, keys, by_name = self._entries, self._keys, self._by_name
+
+        words = normalize(query).split()
+        if not words:
+            candidates = by_name
+        else:
+            # Walk the range of the longest word; the others are checked per entry
+            lead = max(words, key=len)
+            candidates = []
+            position = bisect.bisect_left(keys, (lead, -1))
+            while position < len(keys) and keys[position][0].startswith(lead):
+                candidates.append(keys[position][1])
+                position += 1
+
+        results: List[DirectoryEntry] = []
+        seen: Set[int] = set()
+        for user_id in candidates:
+            if user_id in seen:
+                continue
+            seen.add(user_id)
+            entry = entries[user_id]
+            if len(words) > 1:
+                entry_keys = _search_keys(entry)
+                if not all(any(key.startswith(word) for key in entry_keys) for word in words):
+                    continue
+            if accept is not None and not accept(entry):
+                continue
+            results.append(entry)
+            if len(results) >= limit:
+                break
+        return results
+
+
+# Singleton directory shared by all requests in this process
+directory = UserDirectory()
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _collect_directory_changes(session: Session, flush_context, instances) -> None:
+    """Note whether this transaction adds, removes or renames a user."""
+    if session.info.get("user_directory_changed"):
+        return
+    for obj in list(session.new) + list(session.deleted):
+        if type(obj) in _DIRECTORY_COLUMNS:
+            session.info["user_directory_changed"] = True
+            return
+    for obj in session.dirty:
+        columns = _DIRECTORY_COLUMNS.get(type(obj), ())
+        if any(attributes.get_history(obj, column).has_changes() for column in columns):
+            session.info["user_directory_changed"] = True
+            return
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_directory(session: Session) -> None:
+    if session.info.pop("user_directory_changed", False):
+        directory.invalidate()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_directory_changes(session: Session) -> None:
+    session.info.pop("user_directory_changed", None)
@@ -5,18 +5,24 @@
 -- Drop existing tables if they exist
 DROP TABLE IF EXISTS
     activity_log,
+    analytics_refresh,
     assignment,
+    dashboard_snapshot,
     attendance_detail,
     attendance_record,
     course,
     course_rating,
     enroll,
     feedback,
+    gpa_history,
     grade,
     lecturer,
     manager,
     materials,
     message,
+    message_archive,
+    message_unread_counter,
+    message_unread_total,
     prediction,
     quiz,
     quiz_attempt,
@@ -52,6 +58,9 @@ CREATE TABLE student (
     gpa_history TEXT
 );
 
+-- Legacy JSON gpa_history is backfilled into the gpa_history table on startup
+ALTER TABLE student ADD COLUMN IF NOT EXISTS entrance_year INT;
+
 CREATE TABLE lecturer (
     user_id    INT PRIMARY KEY REFERENCES "user"(user_id) ON DELETE CASCADE,
     title      VARCHAR(100),
@@ -142,6 +151,16 @@ CREATE TABLE quiz (
     created_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Question totals, maintained by the API whenever questions change
+ALTER TABLE quiz ADD COLUMN IF NOT EXISTS question_count INT NOT NULL DEFAULT 0;
+ALTER TABLE quiz ADD COLUMN IF NOT EXISTS max_score DECIMAL(8,2) NOT NULL DEFAULT 0;
+
+-- Per-attempt question/option order, derived from the attempt id (nothing stored)
+ALTER TABLE quiz ADD COLUMN IF NOT EXISTS shuffle BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Bumped by the API whenever questions change, so every process can tell its cached answer key is stale
+ALTER TABLE quiz ADD COLUMN IF NOT EXISTS key_version INT NOT NULL DEFAULT 0;
+
 CREATE TABLE quiz_question (
     question_id    SERIAL PRIMARY KEY,
     quiz_id        INT NOT NULL REFERENCES quiz(quiz_id) ON DELETE CASCADE,
@@ -164,6 +183,9 @@ CREATE TABLE quiz_attempt (
     status      VARCHAR(20) DEFAULT 'in_progress'
 );
 
+-- Idempotency-Key of the submit that completed the attempt (repeats get the stored result)
+ALTER TABLE quiz_attempt ADD COLUMN IF NOT EXISTS submission_key VARCHAR(100);
+
 CREATE TABLE quiz_attempt_detail (
     detail_id     SERIAL PRIMARY KEY,
     attempt_id    INT NOT NULL REFERENCES quiz_attempt(attempt_id) ON DELETE CASCADE,
@@ -221,6 +243,36 @@ CREATE TABLE message (
     created_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Full-text search document ('simple' config: no stemming, works for Vietnamese and English)
+ALTER TABLE message ADD COLUMN IF NOT EXISTS content_tsv TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED;
+
+-- Read messages older than MESSAGE_HOT_DAYS, moved out of message by the API's archive job.
+-- The newest message of every conversation always stays in message.
+CREATE TABLE message_archive (
+    message_id  INT PRIMARY KEY,
+    sender_id   INT NOT NULL REFERENCES "user"(user_id) ON DELETE CASCADE,
+    receiver_id INT NOT NULL REFERENCES "user"(user_id) ON DELETE CASCADE,
+    content     TEXT NOT NULL,
+    is_read     BOOLEAN DEFAULT TRUE,
+    created_at  TIMESTAMP NOT NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    content_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED
+);
+
+-- Unread badges, maintained by the API alongside message writes
+CREATE TABLE message_unread_counter (
+    user_id      INT NOT NULL REFERENCES "user"(user_id) ON DELETE CASCADE,
+    partner_id   INT NOT NULL REFERENCES "user"(user_id) ON DELETE CASCADE,
+    unread_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, partner_id)
+);
+
+CREATE TABLE message_unread_total (
+    user_id      INT PRIMARY KEY REFERENCES "user"(user_id) ON DELETE CASCADE,
+    unread_count INT NOT NULL DEFAULT 0
+);
+
 -- =====================================================
 -- Attendance Tables
 -- =====================================================
@@ -255,6 +307,15 @@ CREATE TABLE prediction (
     created_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- One row per student and semester ("2024-1"), credits come from enrollments
+CREATE TABLE gpa_history (
+    student_id   INT NOT NULL REFERENCES student(user_id) ON DELETE CASCADE,
+    semester     VARCHAR(20) NOT NULL,
+    semester_gpa DECIMAL(3,2) NOT NULL,
+    credits      INT,
+    PRIMARY KEY (student_id, semester)
+);
+
 CREATE TABLE activity_log (
     log_id     SERIAL PRIMARY KEY,
     user_id    INT NOT NULL REFERENCES "user"(user_id) ON DELETE CASCADE,
@@ -264,6 +325,21 @@ CREATE TABLE activity_log (
     timestamp  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE TABLE dashboard_snapshot (
+    snapshot_id        INT PRIMARY KEY,
+    total_students     INT NOT NULL DEFAULT 0,
+    total_lecturers    INT NOT NULL DEFAULT 0,
+    total_courses      INT NOT NULL DEFAULT 0,
+    active_enrollments INT NOT NULL DEFAULT 0,
+    gpa_sum            DECIMAL(14,2) NOT NULL DEFAULT 0,
+    gpa_count          INT NOT NULL DEFAULT 0,
+    updated_at         TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    reconciled_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Students with a current_gpa (the average ignores NULLs), filled by the startup reconcile
+ALTER TABLE dashboard_snapshot ADD COLUMN IF NOT EXISTS gpa_count INT NOT NULL DEFAULT 0;
+
 -- =====================================================
 -- Indexes
 -- =====================================================
@@ -277,8 +353,88 @@ CREATE INDEX idx_assignment_course ON assignment(course_id);
 CREATE INDEX idx_submission_student ON submission(student_id);
 CREATE INDEX idx_quiz_course ON quiz(course_id);
 CREATE INDEX idx_grade_student ON grade(student_id);
+CREATE INDEX idx_gpa_history_semester ON gpa_history(semester);
+CREATE INDEX idx_quiz_attempt_in_progress ON quiz_attempt(quiz_id, started_at) WHERE status = 'in_progress';
 CREATE INDEX idx_message_sender ON message(sender_id);
 CREATE INDEX idx_message_receiver ON message(receiver_id);
+CREATE INDEX idx_message_sender_created ON message(sender_id, created_at DESC, message_id DESC);
+CREATE INDEX idx_message_receiver_created ON message(receiver_id, created_at DESC, message_id DESC);
+CREATE INDEX idx_message_unread ON message(receiver_id, sender_id) WHERE is_read = FALSE;
+CREATE INDEX idx_message_pair_created ON message(sender_id, receiver_id, created_at DESC, message_id DESC);
+CREATE INDEX idx_message_content_tsv ON message USING GIN (content_tsv);
+CREATE INDEX idx_message_archive_sender_created ON message_archive(sender_id, created_at DESC, message_id DESC);
+CREATE INDEX idx_message_archive_receiver_created ON message_archive(receiver_id, created_at DESC, message_id DESC);
+CREATE INDEX idx_message_archive_pair_created ON message_archive(sender_id, receiver_id, created_at DESC, message_id DESC);
+CREATE INDEX idx_message_archive_created ON message_archive(created_at);
+CREATE INDEX idx_message_archive_content_tsv ON message_archive USING GIN (content_tsv);
+
+-- =====================================================
+-- Analytics Views (refreshed in the background by the API)
+-- =====================================================
+
+CREATE TABLE analytics_refresh (
+    view_name    VARCHAR(63) PRIMARY KEY,
+    refreshed_at TIMESTAMP NOT NULL
+);
+
+CREATE MATERIALIZED VIEW mv_course_enrollment AS
+SELECT c.course_id,
+       COUNT(e.enroll_id) AS enrolled_count,
+       COUNT(e.enroll_id) FILTER (WHERE e.status = 'active') AS active_count,
+       MAX(g.average_grade) AS average_grade
+FROM course c
+LEFT JOIN enroll e ON e.course_id = c.course_id
+LEFT JOIN (
+    SELECT g.course_id, AVG(g.score / NULLIF(g.max_score, 0) * 100) AS average_grade
+    FROM grade g
+    JOIN enroll ge ON ge.course_id = g.course_id AND ge.student_id = g.student_id
+    WHERE g.score IS NOT NULL AND g.max_score IS NOT NULL
+    GROUP BY g.course_id
+) g ON g.course_id = c.course_id
+GROUP BY c.course_id;
+
+CREATE UNIQUE INDEX idx_mv_course_enrollment ON mv_course_enrollment(course_id);
+
+CREATE MATERIALIZED VIEW mv_course_attendance AS
+SELECT c.course_id,
+       COUNT(DISTINCT ar.record_id) AS total_records,
+       COUNT(ad.detail_id) FILTER (WHERE ad.status = 'present') AS present_count
+FROM course c
+LEFT JOIN attendance_record ar ON ar.course_id = c.course_id
+LEFT JOIN attendance_detail ad ON ad.record_id = ar.record_id
+GROUP BY c.course_id;
+
+CREATE UNIQUE INDEX idx_mv_course_attendance ON mv_course_attendance(course_id);
+
+CREATE MATERIALIZED VIEW mv_course_quiz_avg AS
+SELECT c.course_id,
+       COUNT(qa.attempt_id) AS attempt_count,
+       AVG(qa.total_score / qm.max_score * 100) AS avg_quiz_score
+FROM course c
+LEFT JOIN quiz q ON q.course_id = c.course_id
+LEFT JOIN (
+    SELECT quiz_id, SUM(COALESCE(NULLIF(points, 0), 1)) AS max_score
+    FROM quiz_question
+    GROUP BY quiz_id
+) qm ON qm.quiz_id = q.quiz_id
+LEFT JOIN quiz_attempt qa ON qa.quiz_id = q.quiz_id
+    AND qa.status = 'completed'
+    AND qa.total_score IS NOT NULL
+    AND qm.max_score > 0
+GROUP BY c.course_id;
+
+CREATE UNIQUE INDEX idx_mv_course_quiz_avg ON mv_course_quiz_avg(course_id);
+
+CREATE MATERIALIZED VIEW mv_course_assignment_avg AS
+SELECT c.course_id,
+       COUNT(s.submission_id) AS graded_count,
+       AVG(s.score / NULLIF(a.max_score, 0) * 100) AS avg_assignment_score
+FROM course c
+LEFT JOIN assignment a ON a.course_id = c.course_id
+LEFT JOIN submission s ON s.assignment_id = a.assignment_id AND s.score IS NOT NULL
+GROUP BY c.course_id;
+
+CREATE UNIQUE INDEX idx_mv_course_assignment_avg ON mv_course_assignment_avg(course_id);
 
 SELECT setval(
   pg_get_serial_sequence('quiz_question', 'question_id'),
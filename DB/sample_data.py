@@ -30,7 +30,7 @@ from models import (
     Base, User, Student, Lecturer, Manager, Course, Enroll, Materials,
     Assignment, Submission, Quiz, QuizQuestion, QuizAttempt, QuizAttemptDetail,
     Grade, Feedback, CourseRating, Message, AttendanceRecord, AttendanceDetail,
-    Prediction, ActivityLog
+    Prediction, ActivityLog, GpaHistory
 )
 
 # Database connection
@@ -529,6 +529,17 @@ def generate_student_gpa_history(session, student_user_ids, last_year: int = 202
 
         # 6) Lưu vào cột gpa_history của Student (TEXT → JSON string)
         stu.gpa_history = json.dumps(history, ensure_ascii=False)
+        stu.entrance_year = entrance_year
+
+        # Bảng gpa_history: mỗi kỳ một dòng (credits được backend điền từ enroll)
+        for entry in semester_entries:
+            session.merge(
+                GpaHistory(
+                    student_id=stu.user_id,
+                    semester=entry["semester"],
+                    semester_gpa=Decimal(str(round(entry["gpa"], 2))),
+                )
+            )
 
         # 7) Cập nhật current_gpa = overall GPA mới nhất
         if semester_entries:
@@ -1076,8 +1087,9 @@ def generate_quizzes_and_questions(session, course_ids):
                 description=f"Assessment quiz {quiz_num} for this course.",
                 duration_minutes=random.choice([15, 20, 30]),
                 max_attempts=random.choice([1, 2, 3]),
-                start_time=datetime.now() - timedelta(days=random.randint(1, 30)),
-                end_time=datetime.now() + timedelta(days=random.randint(7, 30)),
+                # Quiz times are stored in UTC (the API compares them with utcnow)
+                start_time=datetime.utcnow() - timedelta(days=random.randint(1, 30)),
+                end_time=datetime.utcnow() + timedelta(days=random.randint(7, 30)),
                 created_at=datetime.now() - timedelta(days=random.randint(30, 60))
             )
             session.add(quiz)
@@ -211,7 +211,8 @@ export default function LecturerCoursePage() {
           duration_minutes: parseInt(addDuration) || 30,
           max_attempts: parseInt(addMaxAttempts) || 1,
           start_time: new Date().toISOString(), // Make quiz available immediately
-          end_time: addDeadline || undefined,
+          // datetime-local is the browser's local time; the API stores quiz times in UTC
+          end_time: addDeadline ? new Date(addDeadline).toISOString() : undefined,
         });
         
         // Add questions to the quiz
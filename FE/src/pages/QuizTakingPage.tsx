@@ -1,5 +1,5 @@
 import { useNavigate, useParams } from "react-router-dom";
-import { useState, useEffect, useCallback } from "react";
+import { useState, useEffect, useCallback, useRef } from "react";
 import { quizAPI } from "../services/api";
 
 interface QuizQuestion {
@@ -25,6 +25,18 @@ interface AttemptData {
   quiz_id: number;
 }
 
+// crypto.randomUUID only exists in secure contexts (HTTPS or localhost)
+function newSubmissionKey(): string {
+  if (typeof crypto.randomUUID === "function") {
+    return crypto.randomUUID();
+  }
+  const bytes = crypto.getRandomValues(new Uint8Array(16));
+  bytes[6] = (bytes[6] & 0x0f) | 0x40;
+  bytes[8] = (bytes[8] & 0x3f) | 0x80;
+  const hex = Array.from(bytes, (b) => b.toString(16).padStart(2, "0")).join("");
+  return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+}
+
 export default function QuizTakingPage() {
   const navigate = useNavigate();
   const { quizId } = useParams<{ quizId: string }>();
@@ -36,6 +48,11 @@ export default function QuizTakingPage() {
   const [startTime] = useState<number>(Date.now());
   const [loading, setLoading] = useState(true);
   const [submitting, setSubmitting] = useState(false);
+  // Reused on retries so a repeated submit returns the stored result
+  const submissionKey = useRef<string | null>(null);
+  if (submissionKey.current === null) {
+    submissionKey.current = newSubmissionKey();
+  }
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
@@ -53,6 +70,8 @@ export default function QuizTakingPage() {
         const attemptRes = await quizAPI.startAttempt(parseInt(quizId));
         if (attemptRes.data) {
           setAttempt(attemptRes.data);
+          const questionsRes = await quizAPI.getAttemptQuestions(attemptRes.data.attempt_id);
+          setQuiz(questionsRes.data);
         } else {
           setError("Cannot start quiz. You may have reached the maximum number of attempts.");
         }
@@ -131,7 +150,7 @@ export default function QuizTakingPage() {
       const result = await quizAPI.submitAttempt(attempt.attempt_id, { 
         quiz_id: quiz.id,
         answers: answersList 
-      });
+      }, submissionKey.current ?? undefined);
       
       // Clear saved answers on success
       clearSavedAnswers();
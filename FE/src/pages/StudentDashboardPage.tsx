@@ -115,7 +115,7 @@ const StudentDashboardPage: React.FC = () => {
 
         // ---- map GPA history -> data cho chart ----
         const history = gpaHistoryRes.data as {
-          entrance_year: number;
+          entrance_year: number | null;
           points: {
             semester: string;
             semester_gpa: number;
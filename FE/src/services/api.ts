@@ -427,11 +427,19 @@ export const quizAPI = {
     data: {
       quiz_id?: number;
       answers: Array<{ question_id: number; chosen_option: string }>;
-    }
-  ) => api.post(`/quizzes/attempts/${attemptId}/submit`, data),
+    },
+    idempotencyKey?: string
+  ) =>
+    api.post(`/quizzes/attempts/${attemptId}/submit`, data, {
+      headers: idempotencyKey ? { "Idempotency-Key": idempotencyKey } : undefined,
+    }),
 
   getAttempt: (attemptId: number) => api.get(`/quizzes/attempts/${attemptId}`),
 
+  // Questions in the order served to this attempt (shuffled when enabled)
+  getAttemptQuestions: (attemptId: number) =>
+    api.get(`/quizzes/attempts/${attemptId}/questions`),
+
   getAttemptDetail: (attemptId: number) =>
     api.get(`/quizzes/attempts/${attemptId}/detail`),
 
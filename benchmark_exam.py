@@ -0,0 +1,133 @@
+"""
+Exam-mode load benchmark.
+
+Simulates a timed exam against a running API: every student starts the
+quiz at once, autosaves a few times, then everyone submits at the
+deadline. Prints throughput and latency for each phase; the submit phase
+gives sustained submissions per second.
+
+Students log in as <prefix>1..<prefix>N (sample data: student1..student10
+with password123). Each student needs an attempt left on the quiz.
+
+    python benchmark_exam.py --quiz-id 5 --students 10 --concurrency 50
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark quiz start/autosave/submit under concurrency")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--quiz-id", type=int, required=True)
+    parser.add_argument("--students", type=int, default=10, help="Number of student accounts to use")
+    parser.add_argument("--username-prefix", default="student")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--lecturer", help="Lecturer username; when set the quiz is pre-warmed first")
+    parser.add_argument("--concurrency", type=int, default=50, help="Parallel client threads")
+    parser.add_argument("--autosaves", type=int, default=3, help="Autosave requests per student")
+    return parser.parse_args()
+
+
+def login(base_url, username, password):
+    response = requests.post(f"{base_url}/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    try:
+        ok, value = func(*args)
+    except requests.RequestException as e:
+        ok, value = False, str(e)
+    return ok, value, time.perf_counter() - started
+
+
+def run_phase(name, pool, func, items):
+    started = time.perf_counter()
+    results = list(pool.map(lambda item: timed(func, *item), items))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(r[2] for r in results)
+    ok = sum(1 for r in results if r[0])
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)] if latencies else 0.0
+    print(f"\n--- {name} ---")
+    print(f"Requests: {len(results)}  OK: {ok}  Failed: {len(results) - ok}")
+    print(f"Wall time: {elapsed:.2f}s  Throughput: {len(results) / elapsed if elapsed else 0:.1f} req/s")
+    if latencies:
+        print(f"Latency p50: {statistics.median(latencies) * 1000:.0f} ms  p95: {p95 * 1000:.0f} ms  max: {latencies[-1] * 1000:.0f} ms")
+    for r in results:
+        if not r[0]:
+            print(f"First failure: {r[1]}")
+            break
+    return results, elapsed
+
+
+def main():
+    args = parse_args()
+    base_url = args.base_url.rstrip("/")
+
+    if args.lecturer:
+        lecturer = login(base_url, args.lecturer, args.password)
+        response = requests.post(f"{base_url}/quizzes/{args.quiz_id}/exam/prewarm", headers=lecturer)
+        print(f"Prewarm Status: {response.status_code}")
+
+    print(f"Logging in {args.students} students...")
+    headers = [
+        login(base_url, f"{args.username_prefix}{i}", args.password)
+        for i in range(1, args.students + 1)
+    ]
+
+    quiz = requests.get(f"{base_url}/quizzes/{args.quiz_id}", headers=headers[0])
+    quiz.raise_for_status()
+    question_ids = [q["id"] for q in quiz.json()["questions"]]
+    print(f"Quiz {args.quiz_id}: {len(question_ids)} questions")
+
+    def start(h):
+        response = requests.post(f"{base_url}/quizzes/{args.quiz_id}/start", headers=h)
+        if response.status_code != 200:
+            return False, f"{response.status_code} {response.text[:200]}"
+        return True, response.json()["attempt_id"]
+
+    def autosave(h, attempt_id, round_number):
+        # Each round answers the next slice of questions
+        chunk = question_ids[round_number::max(1, args.autosaves)]
+        answers = [{"question_id": qid, "chosen_option": "A"} for qid in chunk]
+        response = requests.put(f"{base_url}/quizzes/attempts/{attempt_id}/answers", json={"answers": answers}, headers=h)
+        return response.status_code == 200, response.text[:200]
+
+    def submit(h, attempt_id):
+        answers = [{"question_id": qid, "chosen_option": "B"} for qid in question_ids[:1]]
+        response = requests.post(
+            f"{base_url}/quizzes/attempts/{attempt_id}/submit",
+            json={"quiz_id": args.quiz_id, "answers": answers},
+            headers=h
+        )
+        return response.status_code == 200, response.text[:200]
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        started, _ = run_phase("Start burst", pool, start, [(h,) for h in headers])
+        attempts = [(h, r[1]) for h, r in zip(headers, started) if r[0]]
+        if not attempts:
+            print("No attempts started; nothing to autosave or submit.")
+            return
+
+        run_phase(
+            "Autosave",
+            pool,
+            autosave,
+            [(h, attempt_id, n) for n in range(args.autosaves) for h, attempt_id in attempts]
+        )
+        submitted, elapsed = run_phase("Submit at deadline", pool, submit, attempts)
+
+    ok = sum(1 for r in submitted if r[0])
+    print(f"\nSustained submissions per second: {ok / elapsed if elapsed else 0:.1f} ({ok} submissions, {args.concurrency} clients)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import uuid
+
+import requests
+
+# Page through message search results whose ranks are all tied
+login_url = 'http://localhost:8000/auth/login'
+login_data = {'username': 'student2', 'password': 'password123'}
+
+try:
+    response = requests.post(login_url, data=login_data)
+    print(f'Login Status: {response.status_code}')
+    if response.status_code == 200:
+        data = response.json()
+        token = data['access_token']
+        user = data['user']
+        headers = {'Authorization': f'Bearer {token}'}
+
+        # Identical content gives every match the same ts_rank_cd
+        marker = f'tiedrank{uuid.uuid4().hex[:12]}'
+        sent_ids = set()
+        print('\n--- Sending messages with tied ranks ---')
+        for _ in range(7):
+            msg_response = requests.post(
+                'http://localhost:8000/messages',
+                json={'receiver_id': 11, 'content': f'{marker} tied rank message'},
+                headers=headers,
+            )
+            print(f'Message Status: {msg_response.status_code}')
+            sent_ids.add(msg_response.json()['id'])
+
+        print('\n--- Paging through search results ---')
+        seen_ids = []
+        cursor = None
+        while True:
+            params = {'q': marker, 'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            search_response = requests.get('http://localhost:8000/messages/search', params=params, headers=headers)
+            print(f'Search Status: {search_response.status_code}')
+            page = search_response.json()
+            seen_ids.extend(item['id'] for item in page['items'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+
+        assert len(seen_ids) == len(set(seen_ids)), f'Repeated rows across pages: {seen_ids}'
+        assert set(seen_ids) == sent_ids, f'Missing rows: {sent_ids - set(seen_ids)}'
+        print(f'Paged through {len(seen_ids)} tied results without gaps or repeats')
+    else:
+        print(f'Login Error: {response.text}')
+except Exception as e:
+    import traceback
+    print(f'Error: {e}')
+    traceback.print_exc()